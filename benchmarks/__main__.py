@@ -0,0 +1,54 @@
+import argparse
+import json
+import platform
+import sys
+from .hot_paths import run_all
+
+
+def compare(results, baseline, threshold):
+    """Trả về danh sách các chỉ số chậm hơn baseline quá `threshold` (tỷ lệ)"""
+    regressions = []
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["value"]
+        new = current["value"]
+        if current["higher_is_better"]:
+            change = (old - new) / old
+        else:
+            change = (new - old) / old
+        if change > threshold:
+            regressions.append((name, old, new, current["unit"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Đo tốc độ các đường nóng của mô phỏng, học và giải thích")
+    parser.add_argument("--output", help="ghi kết quả ra tệp JSON")
+    parser.add_argument("--baseline", help="tệp JSON kết quả cũ để so sánh")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="tỷ lệ chậm đi tối đa trước khi bị coi là thoái lui (mặc định 0.10)")
+    args = parser.parse_args(argv)
+
+    results = run_all()
+    for name, result in results.items():
+        print(f"{name:32s} {result['value']:14.1f} {result['unit']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": platform.python_version(), "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new, unit, change in regressions:
+            print(f"THOÁI LUI {name}: {old:.1f} -> {new:.1f} {unit} ({change:+.0%})")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import random
+import time
+import numpy as np
+from montecarlo.brain import Brain
+from montecarlo.game.direction import Direction
+from montecarlo.game.env import BatchEnv
+from montecarlo.serve import FrozenPolicy, PolicyClient, ServerThread
+from montecarlo.state import FACING_QUEUES, State, StateAction, StateEncoder, N_STATES, N_ACTIONS
+
+
+def best_time(function, repeat=3):
+    """Thời gian nhỏ nhất (giây) của `repeat` lần chạy function"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def metric(value, unit, higher_is_better):
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def trained_brain(seed=0, visited_states=N_STATES):
+    """Brain có bảng phần thưởng ngẫu nhiên trên `visited_states` trạng thái đầu tiên và chính sách tương ứng"""
+    rng = np.random.default_rng(seed)
+    brain = Brain(gamma=0.78)
+    brain.rewards[:visited_states] = rng.normal(size=(visited_states, N_ACTIONS))
+    brain.counts[:visited_states] = rng.integers(1, 100, size=(visited_states, N_ACTIONS))
+    brain.current_policy.improve(brain.rewards, brain.counts)
+    brain.current_policy.exploration = 0.1
+    return brain
+
+
+def synthetic_episode(length, rng):
+    codes = rng.integers(0, N_STATES, length).tolist()
+    actions = rng.integers(0, N_ACTIONS, length).tolist()
+    rewards = rng.choice([-1, 50], length).tolist()
+    rewards[-1] = -300
+    return [list(step) for step in zip(codes, actions, rewards)]
+
+
+def bench_get_action(calls=50000):
+    brain = trained_brain()
+    policy = brain.current_policy
+    rng = random.Random(0)
+    states = [StateEncoder.decode(rng.randrange(N_STATES)) for _ in range(calls)]
+    directions = [rng.choice(list(Direction)) for _ in range(calls)]
+
+    def run():
+        for state, direction in zip(states, directions):
+            policy.get_action(state, direction)
+
+    codes = np.array([StateEncoder.encode(state) for state in states])
+    currents = np.array([direction.value for direction in directions])
+
+    def run_batch():
+        policy.get_actions(codes, currents)
+
+    return {
+        "policy.get_action": metric(calls / best_time(run), "calls/s", True),
+        "policy.get_actions": metric(calls / best_time(run_batch), "actions/s", True),
+    }
+
+
+def bench_state(calls=50000):
+    """Tạo State/StateAction từ đặc trưng mỗi bước như vòng lặp game rồi dùng làm khóa từ điển"""
+    rng = random.Random(0)
+    features = [(StateEncoder.decode(rng.randrange(N_STATES)).sheep_direction, FACING_QUEUES[rng.randrange(16)],
+                 rng.choice(list(Direction))) for _ in range(calls)]
+    table = {}
+
+    def run():
+        for sheep, queue, action in features:
+            table[StateAction(State(sheep, queue), action)] = 1
+
+    return {"state.construct_and_hash": metric(calls / best_time(run), "steps/s", True)}
+
+
+def bench_evaluate(lengths=(100, 1000, 10000)):
+    results = {}
+    rng = np.random.default_rng(0)
+    for length in lengths:
+        episode = synthetic_episode(length, rng)
+        brain = trained_brain()
+
+        def run():
+            brain.evaluate_batch([episode])
+
+        results[f"brain.evaluate[{length}]"] = metric(length / best_time(run), "steps/s", True)
+    return results
+
+
+def bench_improve(visited=(16, 64, N_STATES), repeat=200):
+    results = {}
+    for states in visited:
+        brain = trained_brain(visited_states=states)
+        policy = brain.current_policy
+
+        def run():
+            for _ in range(repeat):
+                policy.improve(brain.rewards, brain.counts)
+
+        results[f"policy.improve[{states}]"] = metric(best_time(run) / repeat * 1e6, "us/call", False)
+    return results
+
+
+def bench_explain(calls=2000):
+    brain = trained_brain()
+    rng = random.Random(0)
+    requests = [(StateEncoder.decode(rng.randrange(N_STATES)), rng.choice(list(Direction))) for _ in range(calls)]
+
+    def cold():
+        for state, action in requests:
+            brain.explainer.cache.clear()
+            brain.explain_action(state, action, Direction.RIGHT)
+
+    def warm():
+        for state, action in requests:
+            brain.explain_action(state, action, Direction.RIGHT)
+
+    warm()
+    return {
+        "brain.explain_action[cold]": metric(best_time(cold) / calls * 1e6, "us/call", False),
+        "brain.explain_action[warm]": metric(best_time(warm) / calls * 1e6, "us/call", False),
+    }
+
+
+def bench_env(games=1024, steps=200):
+    """Bước mô phỏng đầu-cuối: mã hóa trạng thái, chọn hành động bằng chính sách và step BatchEnv"""
+    brain = trained_brain()
+    policy = brain.current_policy
+    env = BatchEnv(games, seed=0)
+
+    def run():
+        for _ in range(steps):
+            env.step(policy.get_actions(env.encoded(), env.directions))
+
+    return {"env.end_to_end": metric(games * steps / best_time(run), "steps/s", True)}
+
+
+def bench_serve(calls=2000, batch=1024, batches=200):
+    """Truy vấn chính sách đóng băng qua máy chủ TCP cục bộ bằng một kết nối giữ lâu"""
+    brain = trained_brain()
+    server = ServerThread(FrozenPolicy.from_policy(brain.current_policy))
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, N_STATES, batch)
+    currents = rng.integers(0, N_ACTIONS, batch)
+    try:
+        with PolicyClient(port=server.port) as client:
+            def single():
+                for _ in range(calls):
+                    client.query([1], [0], [0])
+
+            def batched():
+                for _ in range(batches):
+                    client.query(codes // 16, codes % 16, currents, explain=True)
+
+            return {
+                "serve.round_trip[1]": metric(best_time(single) / calls * 1e6, "us/call", False),
+                "serve.queries[1024]": metric(batch * batches / best_time(batched), "queries/s", True),
+            }
+    finally:
+        server.stop()
+
+
+BENCHMARKS = [bench_get_action, bench_state, bench_evaluate, bench_improve, bench_explain, bench_env, bench_serve]
+
+
+def run_all():
+    results = {}
+    for benchmark in BENCHMARKS:
+        results.update(benchmark())
+    return results
@@ -0,0 +1,27 @@
+import argparse
+import importlib
+
+# Mỗi lệnh con chỉ import module của nó, nên train/eval không phải nạp pygame hay matplotlib
+COMMANDS = {
+    "train": "montecarlo.train",
+    "eval": "montecarlo.evaluate",
+    "play": "montecarlo.play",
+    "serve": "montecarlo.serve",
+    "replay": "montecarlo.trajectory",
+    "sweep": "montecarlo.sweep",
+    "report": "montecarlo.report",
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m montecarlo", description="Người chăn cừu học bằng Monte Carlo")
+    parser.add_argument("command", choices=COMMANDS, help="train: huấn luyện không giao diện, "
+                        "eval: đánh giá chính sách đã lưu, play: mở cửa sổ game, serve: phục vụ chính sách qua TCP, replay: học lại từ các ván đã ghi, "
+                        "sweep: quét siêu tham số, report: báo cáo giải thích trên các ván đã ghi")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="tham số của lệnh con (xem <lệnh> --help)")
+    args = parser.parse_args(argv)
+    importlib.import_module(COMMANDS[args.command]).main(args.args)
+
+
+if __name__ == "__main__":
+    main()
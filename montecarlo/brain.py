@@ -1,56 +1,35 @@
 import random
 import numpy as np
-import shap
 from .policy import Policy
-from .state import State, StateAction
-from .game.direction import ComplexDirection, Direction
-from contextlib import redirect_stdout, redirect_stderr
-import io
+from .explain import ShapleyExplainer
+from .instrument import timed
+from .state import StateEncoder, N_STATES, N_ACTIONS
+from .game.direction import Direction
+from itertools import accumulate
 
 class Brain:
-    def __init__(self, gamma):
-        self.current_policy = Policy()
+    def __init__(self, gamma, seed=None):
+        self.current_policy = Policy(seed)
         self.values = {}
-        self.rewards = {}
+        # Trung bình phần thưởng và số lần thăm cho từng cặp (trạng thái đã mã hóa, hành động)
+        self.rewards = np.zeros((N_STATES, N_ACTIONS), dtype=np.float64)
+        self.counts = np.zeros((N_STATES, N_ACTIONS), dtype=np.int64)
+        # Tổng bình phương độ lệch so với trung bình (Welford), dùng để tính phương sai của ước lượng
+        self.squares = np.zeros((N_STATES, N_ACTIONS), dtype=np.float64)
         self.history = []
         self.gamma = gamma
         self.reward_history = []
-        self.state_history = []
-        self.action_history = []
+        self.explainer = ShapleyExplainer(self.current_policy)
+        # TrajectoryRecorder nhận mọi ván đã đánh giá (None thì không ghi)
+        self.recorder = None
 
+    @timed("brain.choose_direction")
     def choose_direction(self, state, current_direction) -> Direction:
-        direction = self.current_policy.get_action(state, current_direction)
-        self.history.append([StateAction(state, direction), 0])
-        self.state_history.append(self._state_to_vector(state))
-        self.action_history.append(direction)
+        code = StateEncoder.encode(state)
+        direction = self.current_policy.get_encoded_action(code, current_direction)
+        self.history.append([code, direction.value, 0])
         return direction
 
-    def _state_to_vector(self, state):
-        """Chuyển trạng thái thành vector để SHAP xử lý, xử lý trường hợp None"""
-        if state.sheep_direction is None:
-            # Gán giá trị mặc định nếu sheep_direction là None
-            sheep_dir_idx = list(ComplexDirection).index(ComplexDirection.RIGHT)  # Mặc định là RIGHT
-        else:
-            sheep_dir_idx = list(ComplexDirection).index(state.sheep_direction)
-        
-        facing_queue_str = "".join([str(list(Direction).index(d)) for d in state.facing_queue])
-        facing_queue_val = int(facing_queue_str) if facing_queue_str else 0
-        return np.array([sheep_dir_idx, facing_queue_val])
-
-    def _predict_policy(self, states):
-        """Hàm dự đoán hướng từ trạng thái cho SHAP"""
-        actions = []
-        for state_vec in states:
-            sheep_dir = ComplexDirection(list(ComplexDirection)[int(state_vec[0])])
-            facing_queue = set()
-            if state_vec[1] > 0:
-                fq_str = str(int(state_vec[1]))
-                facing_queue = {Direction(int(d)) for d in fq_str}
-            state = State(sheep_dir, facing_queue)
-            action = self.current_policy.get_action(state, Direction.RIGHT)
-            actions.append(list(Direction).index(action))
-        return np.array(actions)
-
     # def _interpret_shap_values(self, shap_values, state, action, current_direction):
     #     """Giải thích chi tiết tại sao người chăn cừu chọn hướng này, kể cả khi đi ngẫu nhiên."""
     #     # Chuẩn bị thông tin
@@ -127,26 +106,16 @@ class Brain:
 
     #     return explanation
 
+    @timed("brain.explain_action")
     def explain_action(self, state, action, current_direction):
-        """Giải thích hành động của người chăn cừu bằng SHAP """
+        """Giải thích hành động của người chăn cừu bằng giá trị Shapley chính xác"""
         # Chuẩn bị thông tin cơ bản
         action_str = str(action).replace("Direction.", "")
         sheep_dir_str = str(state.sheep_direction if state.sheep_direction else "Không xác định").replace("ComplexDirection.", "")
         facing_queue_str = " ".join([str(d).replace("Direction.", "") for d in state.facing_queue]) or "Không có"
 
-        # Kiểm tra dữ liệu lịch sử
-        if not self.state_history:
-            return (f"Người chăn cừu chọn hướng {action_str}.\n"
-                    f"Chưa có đủ dữ liệu để giải thích chi tiết bằng SHAP.")
-
-        # Chuyển trạng thái hiện tại thành vector
-        current_state_vec = self._state_to_vector(state).reshape(1, -1)
-        background_data = np.array(self.state_history[-100:])  # Dùng 100 mẫu gần nhất làm nền
-
-        # Tính toán SHAP values, tắt output không cần thiết
-        explainer = shap.KernelExplainer(self._predict_policy, background_data)
-        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
-            shap_values = explainer.shap_values(current_state_vec, nsamples=50)[0]
+        # Giá trị Shapley được nhớ theo (trạng thái, hành động, phiên bản chính sách)
+        shap_values = self.explainer.shap_values(state, action)
 
         # Xây dựng giải thích tự nhiên
         exploration_rate = self.current_policy.exploration
@@ -190,26 +159,77 @@ class Brain:
         return explanation
 
     def add_reward(self, reward):
-        self.history[-1][1] = reward
+        self.history[-1][2] = reward
 
     def evaluate(self):
-        for i in range(0, len(self.history)):
-            reward = 0
-            counter = 0
-            for j in range(i, len(self.history)):
-                reward += self.history[j][1] * (self.gamma ** counter)
-                counter += 1
-
-            state_action = self.history[i][0]
-            if state_action.state not in self.rewards:
-                self.rewards[state_action.state] = {}
-            if state_action.action not in self.rewards[state_action.state]:
-                self.rewards[state_action.state][state_action.action] = {"reward": 0, "count": 0}
-
-            old_reward = self.rewards[state_action.state][state_action.action]["reward"]
-            count = self.rewards[state_action.state][state_action.action]["count"] + 1
-            self.rewards[state_action.state][state_action.action]["count"] = count
-            self.rewards[state_action.state][state_action.action]["reward"] = old_reward + (reward - old_reward) / count
-
+        self.evaluate_batch([self.history])
         self.history = []
-        self.current_policy.improve(self.rewards)
\ No newline at end of file
+
+    @timed("brain.evaluate")
+    def evaluate_batch(self, histories, improve=True):
+        """Đánh giá nhiều ván đã kết thúc cùng lúc, sau đó cải thiện chính sách một lần"""
+        steps = [step for history in histories for step in history]
+        codes, actions, rewards = zip(*steps) if steps else ((), (), ())
+        return self.evaluate_arrays(np.array(codes, dtype=np.int64), np.array(actions, dtype=np.int64),
+                                    np.array(rewards, dtype=np.float64), [len(history) for history in histories],
+                                    improve)
+
+    def evaluate_arrays(self, codes, actions, rewards, lengths, improve=True):
+        """Như evaluate_batch nhưng nhận các cột (trạng thái, hành động, phần thưởng) đã nối của nhiều ván
+        cùng độ dài từng ván, ví dụ khi học lại từ bản ghi"""
+        if self.recorder is not None:
+            self.recorder.append(codes, actions, rewards, lengths)
+        touched = np.array([], dtype=np.int64)
+        if len(codes):
+            episodes = np.split(np.asarray(rewards, dtype=np.float64), np.cumsum(lengths)[:-1])
+            returns = np.concatenate([discounted_returns(episode, self.gamma) for episode in episodes])
+            touched = self.update(np.asarray(codes, dtype=np.int64), np.asarray(actions, dtype=np.int64), returns)
+        if improve:
+            self.current_policy.improve(self.rewards, self.counts, states=touched, episodes=len(lengths),
+                                        squares=self.squares)
+        return touched
+
+    def update(self, codes, actions, returns):
+        """Cập nhật trung bình tăng dần cho các cặp (trạng thái, hành động), cho phép lặp lại.
+        Trả về các trạng thái đã được cập nhật"""
+        keys, inverse = np.unique(codes * N_ACTIONS + actions, return_inverse=True)
+        sums = np.bincount(inverse, weights=returns)
+        visits = np.bincount(inverse)
+        batch_mean = sums / visits
+        batch_squares = np.bincount(inverse, weights=(returns - batch_mean[inverse]) ** 2)
+        rewards = self.rewards.reshape(-1)
+        counts = self.counts.reshape(-1)
+        squares = self.squares.reshape(-1)
+        old_count = counts[keys]
+        count = old_count + visits
+        old_reward = rewards[keys]
+        rewards[keys] = old_reward + (sums - visits * old_reward) / count
+        counts[keys] = count
+        # Gộp phương sai của lô với phương sai cũ (Chan và cộng sự)
+        squares[keys] += batch_squares + (batch_mean - old_reward) ** 2 * (old_count * visits / count)
+        return np.unique(keys // N_ACTIONS)
+
+    def merge(self, rewards, counts, squares=None):
+        """Gộp bảng (trung bình, số lần, tổng bình phương độ lệch) từ Brain khác bằng công thức trung bình
+        tăng dần chính xác. Trả về các trạng thái đã được cập nhật"""
+        touched = counts > 0
+        old_count = self.counts[touched]
+        count = old_count + counts[touched]
+        old_reward = self.rewards[touched]
+        self.rewards[touched] = old_reward + (rewards[touched] - old_reward) * (counts[touched] / count)
+        self.counts[touched] = count
+        deviation = (rewards[touched] - old_reward) ** 2 * (old_count * counts[touched] / count)
+        self.squares[touched] += deviation if squares is None else squares[touched] + deviation
+        return np.flatnonzero(touched.any(axis=1))
+
+    def reset_statistics(self):
+        self.rewards[:] = 0
+        self.counts[:] = 0
+        self.squares[:] = 0
+
+
+def discounted_returns(rewards, gamma):
+    """Tính G_t = r_t + gamma * G_{t+1} trong một lượt duyệt ngược"""
+    returns = accumulate(reversed(np.asarray(rewards, dtype=np.float64).tolist()),
+                         lambda running, reward: reward + gamma * running)
+    return np.array(list(returns)[::-1], dtype=np.float64)
@@ -0,0 +1,91 @@
+import os
+import numpy as np
+from .brain import Brain
+from .policy import Policy
+from .state import N_STATES, N_ACTIONS
+
+MAGIC = b"MCSH"
+VERSION = 2
+
+# Phần đầu tệp, đọc riêng để kiểm tra phiên bản trước khi ánh xạ toàn bộ tệp
+HEADER = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("n_states", "<u2"),
+    ("n_actions", "<u2"),
+    ("reserved", "<u2", (3,)),
+])
+
+# Bố cục phiên bản 1: mọi mảng có kích thước cố định và được căn lề 8 byte để có thể memory-map
+LAYOUT_V1 = np.dtype([
+    ("header", HEADER),
+    ("exploration", "<f8"),
+    ("improvements", "<i8"),
+    ("gamma", "<f8"),
+    ("policy", "i1", (N_STATES,)),
+    ("rewards", "<f8", (N_STATES, N_ACTIONS)),
+    ("counts", "<i8", (N_STATES, N_ACTIONS)),
+], align=True)
+
+# Phiên bản 2 thêm tổng bình phương độ lệch của các ước lượng (Brain.squares)
+LAYOUT = np.dtype(LAYOUT_V1.descr + [("squares", "<f8", (N_STATES, N_ACTIONS))], align=True)
+LAYOUTS = {1: LAYOUT_V1, 2: LAYOUT}
+
+
+def save(path, brain):
+    """Ghi chính sách, bảng phần thưởng và tỷ lệ khám phá của brain ra tệp nhị phân"""
+    record = np.zeros((), dtype=LAYOUT)
+    record["header"]["magic"] = MAGIC
+    record["header"]["version"] = VERSION
+    record["header"]["n_states"] = N_STATES
+    record["header"]["n_actions"] = N_ACTIONS
+    record["exploration"] = brain.current_policy.exploration
+    record["improvements"] = brain.current_policy.improvements
+    record["gamma"] = brain.gamma
+    record["policy"] = brain.current_policy.policy
+    record["rewards"] = brain.rewards
+    record["counts"] = brain.counts
+    record["squares"] = brain.squares
+    # Ghi ra tệp tạm rồi thay thế để không làm hỏng các tiến trình đang ánh xạ tệp cũ
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(record.tobytes())
+    os.replace(temporary, path)
+
+
+def _open(path, mode):
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    if len(header) == 0 or header[0]["magic"] != MAGIC:
+        raise ValueError(f"{path} không phải tệp checkpoint của MonteCarloShepherd")
+    if header[0]["version"] not in LAYOUTS:
+        raise ValueError(f"Phiên bản checkpoint {header[0]['version']} không được hỗ trợ (cần {VERSION})")
+    if header[0]["n_states"] != N_STATES or header[0]["n_actions"] != N_ACTIONS:
+        raise ValueError(f"Checkpoint {path} có kích thước bảng trạng thái không khớp")
+    return np.memmap(path, dtype=LAYOUTS[int(header[0]["version"])], mode=mode, shape=())
+
+
+def load(path):
+    """Khôi phục Brain để huấn luyện tiếp, các mảng được ánh xạ copy-on-write nên tệp không bị sửa"""
+    record = _open(path, "c")
+    brain = Brain(float(record["gamma"]))
+    brain.rewards = record["rewards"]
+    brain.counts = record["counts"]
+    if "squares" in record.dtype.names:
+        brain.squares = record["squares"]
+    _restore_policy(brain.current_policy, record)
+    return brain
+
+
+def load_policy(path):
+    """Nạp Policy chỉ đọc, nhiều tiến trình suy luận dùng chung trang bộ nhớ của cùng một tệp"""
+    record = _open(path, "r")
+    policy = Policy()
+    _restore_policy(policy, record)
+    return policy
+
+
+def _restore_policy(policy, record):
+    policy.policy = record["policy"]
+    policy.exploration = float(record["exploration"])
+    policy.improvements = int(record["improvements"])
+    policy.version += 1
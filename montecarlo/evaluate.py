@@ -0,0 +1,207 @@
+import argparse
+import json
+import multiprocessing as mp
+import sys
+import time
+from statistics import NormalDist
+import numpy as np
+from . import checkpoint
+from .game.env import BatchEnv
+from .policy import Policy
+from .serve import MAGIC, FrozenPolicy
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def evaluate(policy, episodes=1000, games=256, max_steps=10000, seed=None):
+    """Chạy chính sách tham lam (exploration 0) trên BatchEnv cho đúng `episodes` ván, trả về mảng (độ dài ván,
+    số cừu bắt được, độ dài đuôi khi kết thúc, ván có bị cắt ở max_steps không), số bước giữa các lần bắt
+    và ván chứa từng lần bắt.
+
+    Chỉ bắt đầu đúng `episodes` ván rồi chạy tới khi mọi ván đã bắt đầu kết thúc: nếu lấy `episodes` ván kết thúc
+    đầu tiên thì ván ngắn, vốn kết thúc sớm hơn, bị lấy mẫu quá nhiều. `policy` không bị đổi"""
+    policy = policy.greedy()
+    games = min(games, episodes)
+    env = BatchEnv(games, seed=seed)
+    # Ván đang chạy ở mỗi vị trí có thuộc mẫu không; sau khi đủ số ván, vị trí đó chạy tiếp nhưng bị bỏ qua
+    active = np.ones(games, dtype=bool)
+    started = games
+    catches = np.zeros(games, dtype=np.int64)
+    since_catch = np.zeros(games, dtype=np.int64)
+    pending = [[] for _ in range(games)]
+    lengths, caught, truncated, catch_steps, catch_episodes = [], [], [], [], []
+    while active.any():
+        actions = policy.get_actions(env.encoded(), env.directions)
+        length = env.steps + 1
+        _, _, dones = env.step(actions)
+        since_catch += 1
+        hits = env.caught & active
+        for i in np.flatnonzero(hits).tolist():
+            pending[i].append(int(since_catch[i]))
+        since_catch[hits] = 0
+        catches += hits
+
+        cut = ~dones & (length >= max_steps)
+        if cut.any():
+            env.truncate(cut)
+        ended = (dones | cut) & active
+        for i in np.flatnonzero(ended).tolist():
+            catch_steps.extend(pending[i])
+            catch_episodes.extend([len(lengths)] * len(pending[i]))
+            pending[i] = []
+            lengths.append(int(length[i]))
+            caught.append(int(catches[i]))
+            truncated.append(bool(cut[i]))
+            if started < episodes:
+                started += 1
+            else:
+                active[i] = False
+        catches[ended] = 0
+        since_catch[ended] = 0
+    caught = np.array(caught, dtype=np.int64)
+    return {
+        "episode_length": np.array(lengths, dtype=np.int64),
+        "catches": caught,
+        # Đuôi dài thêm một đốt mỗi lần bắt, tới sức chứa của bộ đệm vị trí
+        "tail_length": np.minimum(caught, env.tail_capacity),
+        "truncated": np.array(truncated, dtype=bool),
+        "steps_to_catch": np.array(catch_steps, dtype=np.int64),
+        "catch_episode": np.array(catch_episodes, dtype=np.int64),
+    }
+
+
+def load(path):
+    """Nạp tệp chính sách đóng băng (serve --export) hoặc chính sách của checkpoint huấn luyện"""
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+    return FrozenPolicy.load(path) if magic == MAGIC else checkpoint.load_policy(path)
+
+
+_policy = None
+
+
+def _load_worker(path):
+    global _policy
+    _policy = load(path)
+
+
+def _evaluate_chunk(task):
+    """Một phần việc của evaluate_parallel: số ván và SeedSequence riêng nên kết quả không phụ thuộc số tiến trình"""
+    episodes, games, max_steps, seed = task
+    env_seed, policy_seed = seed.spawn(2)
+    if isinstance(_policy, Policy):
+        # Trạng thái chưa có hành động tham lam vẫn chọn ngẫu nhiên, nên Policy cũng cần seed riêng cho mỗi phần
+        _policy.rng = np.random.default_rng(policy_seed)
+    return evaluate(_policy, episodes, games, max_steps, env_seed)
+
+
+def evaluate_parallel(path, episodes=1000, workers=None, games=256, max_steps=10000, seed=None, chunk=1000):
+    """Chia `episodes` ván thành các phần `chunk` ván, chạy trên một pool tiến trình (mỗi tiến trình nạp chính sách
+    một lần) rồi nối kết quả theo thứ tự phần. Cùng seed cho cùng kết quả với mọi số tiến trình"""
+    sizes = [min(chunk, episodes - start) for start in range(0, episodes, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(size, games, max_steps, child) for size, child in zip(sizes, seeds)]
+    workers = min(workers or mp.cpu_count(), len(tasks))
+    if workers <= 1:
+        _load_worker(path)
+        parts = [_evaluate_chunk(task) for task in tasks]
+    else:
+        with mp.Pool(workers, initializer=_load_worker, initargs=(path,)) as pool:
+            parts = pool.map(_evaluate_chunk, tasks)
+    offsets = np.cumsum([0] + [len(part["episode_length"]) for part in parts[:-1]])
+    for part, offset in zip(parts, offsets):
+        part["catch_episode"] += offset
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def describe(values, confidence=0.95, episode=None, episodes=None):
+    """Trung bình kèm khoảng tin cậy (xấp xỉ chuẩn), độ lệch chuẩn và các phân vị của một mẫu.
+
+    Nếu các giá trị được gom theo ván (`episode` là ván của từng giá trị, trong `episodes` ván) thì chúng không
+    độc lập: khoảng tin cậy được tính cho ước lượng tỷ số tổng/số lượng theo ván (phương pháp delta)"""
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {"count": 0}
+    mean = float(values.mean())
+    std = float(values.std(ddof=1)) if len(values) > 1 else 0.0
+    if episode is None:
+        error = std / np.sqrt(len(values))
+    else:
+        totals = np.bincount(episode, weights=values, minlength=episodes)
+        counts = np.bincount(episode, minlength=episodes)
+        residuals = totals - mean * counts
+        error = np.sqrt((residuals ** 2).sum() / (episodes * (episodes - 1))) / counts.mean() if episodes > 1 else 0.0
+    margin = NormalDist().inv_cdf(0.5 + confidence / 2) * error
+    return {
+        "count": len(values),
+        "mean": mean,
+        "ci_low": mean - margin,
+        "ci_high": mean + margin,
+        "std": std,
+        "min": float(values.min()),
+        **{f"p{q}": float(p) for q, p in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        "max": float(values.max()),
+    }
+
+
+def summarize(results, confidence=0.95):
+    lengths = results["episode_length"]
+    steps = results["steps_to_catch"]
+    died = ~results["truncated"]
+    return {
+        "episodes": len(lengths),
+        "mean_episode_length": float(lengths.mean()),
+        "mean_catches": float(results["catches"].mean()),
+        "mean_steps_to_catch": float(steps.mean()) if len(steps) else float("nan"),
+        "truncated": int(results["truncated"].sum()),
+        "distributions": {
+            "episode_length": describe(lengths, confidence),
+            "catches": describe(results["catches"], confidence),
+            "steps_to_catch": describe(steps, confidence, results["catch_episode"], len(lengths)),
+            # Chỉ tính các ván kết thúc do va chạm, ván bị cắt ở max_steps không "chết"
+            "tail_length_at_death": describe(results["tail_length"][died], confidence),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m montecarlo eval",
+                                     description="Đánh giá chính sách đã lưu mà không khám phá")
+    parser.add_argument("checkpoint", help="checkpoint huấn luyện hoặc tệp chính sách đóng băng")
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--games", type=int, default=256, help="số ván chạy song song trong mỗi tiến trình")
+    parser.add_argument("--max-steps", type=int, default=10000, help="cắt ván dài hơn số bước này")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="số tiến trình đánh giá (mặc định: số CPU)")
+    parser.add_argument("--chunk", type=int, default=1000, help="số ván mỗi phần việc giao cho một tiến trình")
+    parser.add_argument("--confidence", type=float, default=0.95, help="mức tin cậy của các khoảng tin cậy")
+    parser.add_argument("--json", default=None, help="ghi kết quả đầy đủ ra tệp JSON này")
+    parser.add_argument("--min-catches", type=float, default=None,
+                        help="thoát với mã 1 nếu cận dưới khoảng tin cậy của số cừu/ván thấp hơn ngưỡng này")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = evaluate_parallel(args.checkpoint, args.episodes, args.workers, args.games, args.max_steps,
+                                args.seed, args.chunk)
+    summary = summarize(results, args.confidence)
+    summary["seconds"] = time.perf_counter() - start
+    for name, value in summary.items():
+        if name != "distributions":
+            print(f"{name:22s} {value}")
+    print(f"{'':22s} {'trung bình':>10s} {'khoảng tin cậy':>21s} {'p5':>7s} {'p50':>7s} {'p95':>7s}")
+    for name, stats in summary["distributions"].items():
+        if stats["count"]:
+            print(f"{name:22s} {stats['mean']:10.2f} [{stats['ci_low']:9.2f}, {stats['ci_high']:9.2f}] "
+                  f"{stats['p5']:7.0f} {stats['p50']:7.0f} {stats['p95']:7.0f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.min_catches is not None and summary["distributions"]["catches"]["ci_low"] < args.min_catches:
+        print(f"Không đạt: cận dưới số cừu/ván {summary['distributions']['catches']['ci_low']:.2f} "
+              f"< {args.min_catches}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from .policy import NO_ACTION
+from .state import StateEncoder, N_QUEUES, N_STATES, N_ACTIONS
+
+N_SHEEP_DIRECTIONS = N_STATES // N_QUEUES
+
+
+class ShapleyExplainer:
+    """Tính giá trị Shapley chính xác cho hai đặc trưng (hướng cừu, hàng đợi) bằng cách liệt kê toàn bộ không gian trạng thái.
+
+    Mô hình được giải thích là xác suất chính sách tham lam chọn `action` (1/N_ACTIONS nếu trạng thái chưa có
+    hành động tham lam), nền là phân phối đều trên mọi trạng thái. Kết quả được nhớ trong bộ đệm LRU và bị xóa
+    khi Policy.version thay đổi.
+    """
+
+    def __init__(self, policy, maxsize=1024):
+        self.policy = policy
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.version = policy.version
+
+    def shap_values(self, state, action):
+        """Trả về (ảnh hưởng hướng cừu, ảnh hưởng hàng đợi) cho (state, action)"""
+        return self.shap_values_encoded(StateEncoder.encode(state), action.value)
+
+    def shap_values_encoded(self, code, action):
+        if self.version != self.policy.version:
+            self.cache.clear()
+            self.version = self.policy.version
+
+        key = (code, action)
+        values = self.cache.get(key)
+        if values is not None:
+            self.cache.move_to_end(key)
+            return values
+
+        values = self._compute(code, action)
+        self.cache[key] = values
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return values
+
+    def _compute(self, code, action):
+        greedy = self.policy.policy.reshape(N_SHEEP_DIRECTIONS, N_QUEUES)
+        model = np.where(greedy == NO_ACTION, 1 / N_ACTIONS, greedy == action)
+        sheep, queue = divmod(code, N_QUEUES)
+
+        # Giá trị của các liên minh: không đặc trưng, chỉ hướng cừu, chỉ hàng đợi, cả hai
+        empty = model.mean()
+        only_sheep = model[sheep, :].mean()
+        only_queue = model[:, queue].mean()
+        full = model[sheep, queue]
+
+        shap_sheep = 0.5 * ((only_sheep - empty) + (full - only_queue))
+        shap_queue = 0.5 * ((only_queue - empty) + (full - only_sheep))
+        return float(shap_sheep), float(shap_queue)
+
+
+def shapley_table(policy):
+    """Giá trị Shapley (hướng cừu, hàng đợi) của mọi cặp (trạng thái, hành động) cùng lúc, mảng (N_STATES, N_ACTIONS, 2).
+    Cùng mô hình và nền với ShapleyExplainer, dùng cho phân tích hàng loạt"""
+    greedy = policy.policy.reshape(N_SHEEP_DIRECTIONS, N_QUEUES, 1)
+    model = np.where(greedy == NO_ACTION, 1 / N_ACTIONS, greedy == np.arange(N_ACTIONS))
+    empty = model.mean(axis=(0, 1))
+    only_sheep = model.mean(axis=1, keepdims=True)
+    only_queue = model.mean(axis=0, keepdims=True)
+    shap_sheep = 0.5 * ((only_sheep - empty) + (model - only_queue))
+    shap_queue = 0.5 * ((only_queue - empty) + (model - only_sheep))
+    return np.stack([shap_sheep, shap_queue], axis=-1).reshape(N_STATES, N_ACTIONS, 2)
+
+
+class ExplanationService:
+    """Luồng nền chạy Brain.explain_action, chỉ giữ yêu cầu mới nhất và công bố lời giải thích đã xong gần nhất"""
+
+    def __init__(self, brain):
+        self.brain = brain
+        self.condition = threading.Condition()
+        self.pending = None
+        self.explanation = ""
+        # Tăng khi clear() để bỏ kết quả của yêu cầu đang tính dở
+        self.generation = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="explanation-service", daemon=True)
+        self.thread.start()
+
+    def submit(self, state, action, current_direction):
+        """Gửi yêu cầu giải thích, yêu cầu cũ chưa xử lý sẽ bị bỏ"""
+        with self.condition:
+            self.pending = (state, action, current_direction)
+            self.condition.notify()
+
+    def latest(self):
+        return self.explanation
+
+    def clear(self):
+        with self.condition:
+            self.pending = None
+            self.explanation = ""
+            self.generation += 1
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                request = self.pending
+                generation = self.generation
+                self.pending = None
+            explanation = self.brain.explain_action(*request)
+            with self.condition:
+                if generation == self.generation:
+                    self.explanation = explanation
@@ -0,0 +1,167 @@
+import numpy as np
+from .direction import Direction, ComplexDirection
+from ..state import FACING_QUEUES, NO_SHEEP, StateEncoder
+from ..instrument import timed
+
+# Dịch chuyển theo Direction.value: LEFT, RIGHT, UP, DOWN
+DX = np.array([-1, 1, 0, 0], dtype=np.int64)
+DY = np.array([0, 0, -1, 1], dtype=np.int64)
+
+# SHEEP_TABLE[sign(dx) + 1, sign(dy) + 1] -> ComplexDirection.value
+SHEEP_TABLE = np.array([
+    [ComplexDirection.TOP_LEFT.value, ComplexDirection.LEFT.value, ComplexDirection.BOTTOM_LEFT.value],
+    [ComplexDirection.UP.value, NO_SHEEP, ComplexDirection.DOWN.value],
+    [ComplexDirection.TOP_RIGHT.value, ComplexDirection.RIGHT.value, ComplexDirection.BOTTOM_RIGHT.value],
+], dtype=np.int64)
+
+
+def move(x, y, directions, grid_side, speed=1):
+    """Phiên bản vector hóa của Shepperd.move"""
+    return (x + DX[directions] * speed) % grid_side, (y + DY[directions] * speed) % grid_side
+
+
+def sheep_directions(x, y, sheep_x, sheep_y):
+    """Phiên bản vector hóa của Shepperd.get_sheep_direction, None được mã hóa thành NO_SHEEP"""
+    return SHEEP_TABLE[np.sign(sheep_x - x) + 1, np.sign(sheep_y - y) + 1]
+
+
+def queue_directions(occupancy, x, y, current_directions):
+    """Phiên bản vector hóa của Shepperd.get_queue_directions dựa trên lưới chiếm chỗ (có viền) của từng ván,
+    trả về bitmask 1 << Direction.value"""
+    games = np.arange(len(x))
+    x = x + 1
+    y = y + 1
+    up = (occupancy[games, x, y - 1] > 0) & (current_directions != Direction.DOWN.value)
+    down = (occupancy[games, x, y + 1] > 0) & (current_directions != Direction.UP.value)
+    left = (occupancy[games, x - 1, y] > 0) & (current_directions != Direction.RIGHT.value)
+    right = (occupancy[games, x + 1, y] > 0) & (current_directions != Direction.LEFT.value)
+    return ((left << Direction.LEFT.value) | (right << Direction.RIGHT.value)
+            | (up << Direction.UP.value) | (down << Direction.DOWN.value))
+
+
+@timed("env.collision")
+def tail_collisions(occupancy, x, y):
+    """Kiểm tra va chạm với đuôi cho cả batch"""
+    return occupancy[np.arange(len(x)), x + 1, y + 1] > 0
+
+
+def mask_to_directions(mask):
+    """Chuyển bitmask hàng đợi về tập Direction (dùng chung, bất biến) như Shepperd.get_queue_directions"""
+    return FACING_QUEUES[mask]
+
+
+class BatchEnv:
+    """Môi trường không giao diện chạy song song n ván chăn cừu với luật chơi của reinforced_snake.py"""
+
+    def __init__(self, n, grid_side=16, start=(0, 5), tail_capacity=200,
+                 catch_reward=50, step_reward=-1, death_reward=-300, seed=None):
+        self.n = n
+        self.grid_side = grid_side
+        self.start = start
+        self.tail_capacity = tail_capacity
+        self.catch_reward = catch_reward
+        self.step_reward = step_reward
+        self.death_reward = death_reward
+        self.rng = np.random.default_rng(seed)
+
+        self.x = np.zeros(n, dtype=np.int64)
+        self.y = np.zeros(n, dtype=np.int64)
+        self.sheep_x = np.zeros(n, dtype=np.int64)
+        self.sheep_y = np.zeros(n, dtype=np.int64)
+        self.sheeps = np.zeros(n, dtype=np.int64)
+        self.directions = np.full(n, Direction.RIGHT.value, dtype=np.int64)
+        self.steps = np.zeros(n, dtype=np.int64)
+        # Các ván bắt được cừu ở lần step gần nhất (kể cả khi cũng va chạm ở bước đó)
+        self.caught = np.zeros(n, dtype=bool)
+
+        # Bộ đệm vòng past_positions dùng chung con trỏ ghi vì mọi ván đều đi một bước mỗi lần step.
+        # occupancy đếm các vị trí trong cửa sổ [0, sheeps) của từng ván, có thêm viền một ô
+        self.tail_x = np.zeros((n, tail_capacity), dtype=np.int64)
+        self.tail_y = np.zeros((n, tail_capacity), dtype=np.int64)
+        self.pointer = 0
+        self.size = 0
+        self.occupancy = np.zeros((n, grid_side + 2, grid_side + 2), dtype=np.int32)
+        self.reset()
+
+    def reset(self):
+        self._reset_games(np.ones(self.n, dtype=bool))
+        self.directions[:] = Direction.RIGHT.value
+        self._push()
+        return self.observe()
+
+    def _reset_games(self, mask):
+        count = int(mask.sum())
+        self.x[mask] = self.start[0]
+        self.y[mask] = self.start[1]
+        self.sheeps[mask] = 0
+        self.steps[mask] = 0
+        self.occupancy[mask] = 0
+        self.sheep_x[mask] = self.rng.integers(0, self.grid_side, count)
+        self.sheep_y[mask] = self.rng.integers(0, self.grid_side, count)
+
+    def truncate(self, mask):
+        """Kết thúc sớm các ván trong mask (ví dụ khi vượt quá số bước tối đa) và đặt lại như khi va chạm"""
+        self._reset_games(mask)
+        # Vị trí đầu vừa ghi thuộc về ván cũ, thay bằng điểm xuất phát như ở nhánh va chạm trong step()
+        column = (self.pointer - 1) % self.tail_capacity
+        self.tail_x[mask, column] = self.start[0]
+        self.tail_y[mask, column] = self.start[1]
+
+    def _mark(self, games, index, delta):
+        """Cộng delta vào ô của past_positions[index] của các ván `games` (không lặp lại) trên lưới chiếm chỗ"""
+        column = (self.pointer - 1 - index) % self.tail_capacity
+        self.occupancy[games, self.tail_x[games, column] + 1, self.tail_y[games, column] + 1] += delta
+
+    def _push(self):
+        # Đốt cuối cửa sổ bị đẩy ra, vị trí mới vào ở đầu
+        leaving = np.flatnonzero((self.sheeps > 0) & (self.sheeps <= self.size))
+        self._mark(leaving, self.sheeps[leaving] - 1, -1)
+        self.tail_x[:, self.pointer] = self.x
+        self.tail_y[:, self.pointer] = self.y
+        self.pointer = (self.pointer + 1) % self.tail_capacity
+        self.size = min(self.size + 1, self.tail_capacity)
+        entering = np.flatnonzero(self.sheeps > 0)
+        self._mark(entering, 0, 1)
+
+    def _grow(self, mask):
+        games = np.flatnonzero(mask & (self.sheeps < self.tail_capacity))
+        self.sheeps[games] += 1
+        games = games[self.sheeps[games] <= self.size]
+        self._mark(games, self.sheeps[games] - 1, 1)
+
+    def observe(self):
+        """Trả về (hướng cừu, bitmask hàng đợi) của mọi ván"""
+        return (sheep_directions(self.x, self.y, self.sheep_x, self.sheep_y),
+                queue_directions(self.occupancy, self.x, self.y, self.directions))
+
+    def step(self, actions):
+        """Đi một bước cho mọi ván, trả về (quan sát mới, phần thưởng, cờ kết thúc)"""
+        self.directions = np.asarray(actions, dtype=np.int64)
+        self.x, self.y = move(self.x, self.y, self.directions, self.grid_side)
+        self.steps += 1
+
+        caught = (self.x == self.sheep_x) & (self.y == self.sheep_y)
+        self.caught = caught
+        count = int(caught.sum())
+        if count:
+            self.sheep_x[caught] = self.rng.integers(0, self.grid_side, count)
+            self.sheep_y[caught] = self.rng.integers(0, self.grid_side, count)
+            self._grow(caught)
+        rewards = np.where(caught, self.catch_reward, self.step_reward)
+
+        dones = tail_collisions(self.occupancy, self.x, self.y)
+        if dones.any():
+            rewards[dones] = self.death_reward
+            self._reset_games(dones)
+
+        self._push()
+        return self.observe(), rewards, dones
+
+    def encoded(self, observation=None):
+        """Mã hóa quan sát thành chỉ số trạng thái của StateEncoder"""
+        sheep, queue = self.observe() if observation is None else observation
+        return StateEncoder.encode_arrays(sheep, queue)
+
+    def states(self, observation=None):
+        """Tạo danh sách State để Brain sử dụng"""
+        return [StateEncoder.decode(code) for code in self.encoded(observation).tolist()]
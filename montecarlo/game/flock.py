@@ -0,0 +1,98 @@
+import math
+from .grid import Grid
+from .items import Sheep
+
+
+class Flock:
+    """Đàn cừu kèm chỉ mục không gian: sân được chia thành buckets_per_side × buckets_per_side nhóm ô đều nhau,
+    mỗi nhóm giữ danh sách cừu bên trong và được cập nhật ngay khi cừu bị bắt và xuất hiện lại.
+
+    nearest() tìm theo từng vòng nhóm quanh người chăn cừu (khoảng cách Manhattan không quấn biên, cùng cách so sánh
+    tọa độ của Shepperd.get_sheep_direction nên đặc trưng hướng cừu luôn chỉ về con được chọn) và dừng khi không
+    nhóm nào ở vòng ngoài có thể gần hơn, nên chi phí chỉ phụ thuộc mật độ cừu quanh đó chứ không phụ thuộc kích
+    thước sân hay tổng số cừu.
+    """
+
+    def __init__(self, grid: Grid, count=1, bucket_side=None):
+        self.grid = grid
+        side = grid.grid_side
+        if bucket_side is None:
+            # Trung bình khoảng một con cừu mỗi nhóm
+            bucket_side = max(1, round(side / math.sqrt(max(count, 1))))
+        self.buckets_per_side = max(1, side // bucket_side)
+        # Nhóm hẹp nhất, dùng làm cận dưới khoảng cách tới các vòng chưa xét
+        self.min_width = side // self.buckets_per_side
+        self.buckets = [[[] for _ in range(self.buckets_per_side)] for _ in range(self.buckets_per_side)]
+        self.sheep = []
+        for _ in range(count):
+            sheep = Sheep(grid.random_cell(), grid.random_cell())
+            self.sheep.append(sheep)
+            self._insert(sheep)
+
+    def __iter__(self):
+        return iter(self.sheep)
+
+    def __len__(self):
+        return len(self.sheep)
+
+    def _bucket(self, x_cell, y_cell):
+        n = self.buckets_per_side
+        side = self.grid.grid_side
+        return self.buckets[x_cell * n // side][y_cell * n // side]
+
+    def _insert(self, sheep):
+        self._bucket(sheep.x_cell, sheep.y_cell).append(sheep)
+
+    def _remove(self, sheep):
+        self._bucket(sheep.x_cell, sheep.y_cell).remove(sheep)
+
+    def at(self, x_cell, y_cell):
+        """Con cừu đứng ở ô (x_cell, y_cell) hoặc None"""
+        for sheep in self._bucket(x_cell, y_cell):
+            if sheep.x_cell == x_cell and sheep.y_cell == y_cell:
+                return sheep
+        return None
+
+    def respawn(self, sheep):
+        """Cừu bị bắt xuất hiện lại ở một ô ngẫu nhiên"""
+        self._remove(sheep)
+        sheep.x_cell = self.grid.random_cell()
+        sheep.y_cell = self.grid.random_cell()
+        self._insert(sheep)
+
+    def reset(self):
+        """Rải lại cả đàn (khi bắt đầu ván mới)"""
+        for sheep in self.sheep:
+            self.respawn(sheep)
+
+    def distance(self, x_cell, y_cell, sheep):
+        # Không quấn biên: cừu ngay bên kia mép trái vẫn được get_sheep_direction báo là ở bên phải
+        return abs(x_cell - sheep.x_cell) + abs(y_cell - sheep.y_cell)
+
+    def nearest(self, x_cell, y_cell):
+        """Con cừu gần (x_cell, y_cell) nhất theo khoảng cách Manhattan không quấn biên, None nếu đàn rỗng"""
+        n = self.buckets_per_side
+        side = self.grid.grid_side
+        bx = x_cell * n // side
+        by = y_cell * n // side
+        # Vòng đủ lớn để phủ mọi nhóm của sân
+        last = max(bx, n - 1 - bx, by, n - 1 - by)
+        best = None
+        best_distance = None
+        radius = 0
+        while True:
+            for dx in range(-radius, radius + 1):
+                # Chỉ các nhóm nằm trên viền vòng bán kính radius và còn trong sân
+                step = 1 if abs(dx) == radius else 2 * radius
+                for dy in range(-radius, radius + 1, max(step, 1)):
+                    if not (0 <= bx + dx < n and 0 <= by + dy < n):
+                        continue
+                    for sheep in self.buckets[bx + dx][by + dy]:
+                        distance = self.distance(x_cell, y_cell, sheep)
+                        if best is None or distance < best_distance:
+                            best = sheep
+                            best_distance = distance
+            # Cừu ở vòng radius + 1 trở ra cách ít nhất radius * min_width + 1 ô theo một trục
+            if (best is not None and best_distance <= radius * self.min_width) or radius >= last:
+                return best
+            radius += 1
@@ -0,0 +1,134 @@
+import pygame
+from .grid import Grid
+from ..instrument import timed
+
+BACKGROUND = (255, 255, 255)
+PANEL_COLOR = (200, 200, 200)
+TEXT_COLOR = (0, 0, 0)
+PAUSE_COLOR = (255, 0, 0)
+
+
+def load_font(size):
+    try:
+        return pygame.font.SysFont("timesnewroman", size)
+    except Exception:
+        return pygame.font.Font(None, size)
+
+
+def wrap_text(text, font, max_width):
+    lines = []
+    for line in text.split('\n'):
+        words = line.split(' ')
+        current_line = ''
+        for word in words:
+            test_line = current_line + word + ' '
+            if font.size(test_line)[0] <= max_width:
+                current_line = test_line
+            else:
+                if current_line:
+                    lines.append(current_line.strip())
+                current_line = word + ' '
+        if current_line:
+            lines.append(current_line.strip())
+    return lines
+
+
+class TextPanel:
+    """Khung giải thích bên phải, chỉ xuống dòng và render lại khi nội dung thay đổi"""
+
+    def __init__(self, rect, font, line_height=25, padding=10):
+        self.rect = pygame.Rect(rect)
+        self.font = font
+        self.line_height = line_height
+        self.padding = padding
+        self.surface = pygame.Surface(self.rect.size)
+        self.text = None
+
+    def set_text(self, text):
+        """Trả về True nếu khung cần được vẽ lại"""
+        if text == self.text:
+            return False
+        self.text = text
+        self.surface.fill(PANEL_COLOR)
+        if text:
+            max_width = self.rect.width - 2 * self.padding
+            for i, line in enumerate(wrap_text(text, self.font, max_width)):
+                rendered = self.font.render(line, True, TEXT_COLOR)
+                self.surface.blit(rendered, (self.padding, self.padding + i * self.line_height))
+        return True
+
+
+class Renderer:
+    """Vẽ sân chơi bằng dirty rectangles: chỉ xóa và cập nhật các ô có sprite ở khung trước và khung này"""
+
+    def __init__(self, canvas, grid: Grid, shepperd_sprite, sheep_sprite, tail_sprite, field_side=800):
+        self.canvas = canvas
+        self.grid = grid
+        self.shepperd_sprite = shepperd_sprite
+        self.sheep_sprite = sheep_sprite
+        self.tail_sprite = tail_sprite
+        self.field = pygame.Rect(0, 0, field_side, field_side)
+        self.panel = TextPanel((field_side, 0, canvas.get_width() - field_side, canvas.get_height()), load_font(24))
+        self.pause_text = load_font(36).render("Đã tạm dừng - Nhấn Enter để tiếp tục", True, PAUSE_COLOR)
+        self.overlay_font = load_font(16)
+        self.overlay_text = None
+        self.overlay_surface = None
+        self.clock = pygame.time.Clock()
+        self.previous_rects = []
+        self.paused = None
+
+    def _cell_rect(self, sprite, x_cell, y_cell):
+        return sprite.get_rect(topleft=(self.grid.from_cell(x_cell), self.grid.from_cell(y_cell)))
+
+    def _render_overlay(self, text):
+        if text != self.overlay_text:
+            self.overlay_text = text
+            lines = [self.overlay_font.render(line, True, TEXT_COLOR) for line in text.split("\n")]
+            width = max(line.get_width() for line in lines) + 10
+            self.overlay_surface = pygame.Surface((width, len(lines) * 18 + 10))
+            self.overlay_surface.fill(PANEL_COLOR)
+            self.overlay_surface.set_alpha(220)
+            for i, line in enumerate(lines):
+                self.overlay_surface.blit(line, (5, 5 + i * 18))
+        return self.overlay_surface
+
+    @timed("render.update_screen")
+    def draw(self, shepperd, tail_positions, flock, explanation="", paused=False, overlay=""):
+        """Vẽ một khung hình. tail_positions là danh sách (x, y) của các đốt đuôi, flock là các con cừu, overlay là văn bản
+        hiển thị ở góc trên bên trái sân chơi (ví dụ số liệu đo hiệu năng)"""
+        full_redraw = paused != self.paused
+        self.paused = paused
+        dirty = []
+
+        if full_redraw:
+            self.canvas.fill(BACKGROUND, self.field)
+            self.panel.text = None
+        else:
+            for rect in self.previous_rects:
+                self.canvas.fill(BACKGROUND, rect)
+            dirty.extend(self.previous_rects)
+
+        rects = [self.canvas.blit(self.shepperd_sprite, self._cell_rect(self.shepperd_sprite, shepperd.x_cell, shepperd.y_cell))]
+        for x_cell, y_cell in tail_positions:
+            rects.append(self.canvas.blit(self.tail_sprite, self._cell_rect(self.tail_sprite, x_cell, y_cell)))
+        for sheep in flock:
+            rects.append(self.canvas.blit(self.sheep_sprite, self._cell_rect(self.sheep_sprite, sheep.x_cell, sheep.y_cell)))
+        if overlay:
+            rects.append(self.canvas.blit(self._render_overlay(overlay), (5, 5)))
+        dirty.extend(rects)
+        self.previous_rects = rects
+
+        if self.panel.set_text(explanation):
+            self.canvas.blit(self.panel.surface, self.panel.rect)
+            dirty.append(self.panel.rect)
+
+        if paused:
+            dirty.append(self.canvas.blit(self.pause_text, (200, 350)))
+
+        if full_redraw:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+
+    def tick(self, fps):
+        self.clock.tick(fps)
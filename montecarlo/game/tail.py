@@ -0,0 +1,71 @@
+import numpy as np
+from .direction import Direction
+from ..state import FACING_QUEUES
+
+
+class Tail:
+    """Lịch sử vị trí của người chăn cừu dạng bộ đệm vòng kèm lưới chiếm chỗ.
+
+    positions(i) tương đương past_positions[i] cũ (0 là vị trí mới nhất). Lưới `occupancy` đếm các vị trí
+    trong cửa sổ [0, length) và được cập nhật dần ở push/grow/reset, nên kiểm tra va chạm và hàng đợi là O(1).
+    Lưới có thêm một viền ô trống để tra ô lân cận ngoài biên mà không cần kiểm tra chỉ số.
+    """
+
+    def __init__(self, grid_side, capacity=200):
+        self.capacity = capacity
+        self.xs = [0] * capacity
+        self.ys = [0] * capacity
+        self.head = 0
+        self.size = 0
+        self.length = 0
+        self.occupancy = np.zeros((grid_side + 2, grid_side + 2), dtype=np.int32)
+
+    def position(self, i):
+        index = (self.head - 1 - i) % self.capacity
+        return self.xs[index], self.ys[index]
+
+    def positions(self, start, stop):
+        return [self.position(i) for i in range(start, min(stop, self.size))]
+
+    def _mark(self, i, delta):
+        x, y = self.position(i)
+        self.occupancy[x + 1, y + 1] += delta
+
+    def push(self, x, y):
+        """Thêm vị trí mới nhất, vị trí ở cuối cửa sổ bị đẩy ra khỏi đuôi"""
+        if 0 < self.length <= self.size:
+            self._mark(self.length - 1, -1)
+        self.xs[self.head] = x
+        self.ys[self.head] = y
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        if self.length > 0:
+            self._mark(0, 1)
+
+    def grow(self):
+        """Đuôi dài thêm một đốt (khi bắt được cừu)"""
+        if self.length < self.capacity:
+            self.length += 1
+            if self.length <= self.size:
+                self._mark(self.length - 1, 1)
+
+    def reset(self):
+        self.length = 0
+        self.occupancy[:] = 0
+
+    def occupied(self, x, y):
+        return self.occupancy[x + 1, y + 1] > 0
+
+    def facing_queue(self, x, y, current_direction: Direction):
+        """Giống Shepperd.get_queue_directions(past_positions[1:length], current_direction) nhưng chỉ xét 4 ô lân cận"""
+        mask = 0
+        if self.occupancy[x + 1, y] and current_direction != Direction.DOWN:
+            mask |= 1 << Direction.UP.value
+        if self.occupancy[x + 1, y + 2] and current_direction != Direction.UP:
+            mask |= 1 << Direction.DOWN.value
+        if self.occupancy[x, y + 1] and current_direction != Direction.RIGHT:
+            mask |= 1 << Direction.LEFT.value
+        if self.occupancy[x + 2, y + 1] and current_direction != Direction.LEFT:
+            mask |= 1 << Direction.RIGHT.value
+        # Tập dùng chung, bất biến nên State(...) tra được bitmask mà không cần duyệt lại
+        return FACING_QUEUES[mask]
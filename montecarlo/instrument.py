@@ -0,0 +1,116 @@
+import atexit
+import json
+from collections import deque
+from functools import wraps
+from time import perf_counter
+import numpy as np
+
+# Số mẫu gần nhất giữ lại cho mỗi bộ đếm để tính phân vị
+SAMPLES = 4096
+
+
+class _State:
+    enabled = False
+
+
+_state = _State()
+_timers = {}
+
+
+class Timer:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+    def summary(self):
+        p50, p90, p99 = np.percentile(self.samples, [50, 90, 99]) if self.samples else (0.0, 0.0, 0.0)
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_us": self.total / self.count * 1e6 if self.count else 0.0,
+            "p50_us": p50 * 1e6,
+            "p90_us": p90 * 1e6,
+            "p99_us": p99 * 1e6,
+            "max_us": self.max * 1e6,
+        }
+
+
+def enable(flag=True):
+    _state.enabled = flag
+
+
+def enabled():
+    return _state.enabled
+
+
+def reset():
+    _timers.clear()
+
+
+def record(name, seconds):
+    timer = _timers.get(name)
+    if timer is None:
+        timer = _timers[name] = Timer()
+    timer.record(seconds)
+
+
+def timed(name):
+    """Decorator đo thời gian gọi hàm; khi tắt chỉ tốn một phép kiểm tra cờ"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return function(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class section:
+    """Context manager đo một đoạn mã trong vòng lặp game"""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter() if _state.enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            record(self.name, perf_counter() - self.start)
+        return False
+
+
+def snapshot():
+    """Số lần gọi và thời gian cộng dồn/phân vị của mọi bộ đếm"""
+    return {name: timer.summary() for name, timer in sorted(_timers.items())}
+
+
+def format_lines():
+    return [f"{name}: {s['count']} lần, tb {s['mean_us']:.0f}us, p99 {s['p99_us']:.0f}us"
+            for name, s in snapshot().items()]
+
+
+def dump(path):
+    with open(path, "w") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+def dump_at_exit(path):
+    atexit.register(lambda: _timers and dump(path))
@@ -0,0 +1,272 @@
+import argparse
+import os
+import time
+from collections import deque
+import pygame
+from . import checkpoint, instrument
+from .brain import Brain
+from .explain import ExplanationService
+from .stats_log import CatchLog, CatchLogReader, Downsampler
+from .state import State
+from .trajectory import TrajectoryRecorder
+from .game.flock import Flock
+from .game.grid import Grid
+from .game.items import *
+from .game.render import Renderer
+from .game.tail import Tail
+
+SPRITES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sprites")
+
+# Số bước mô phỏng cho mỗi khung hình; chế độ tăng tốc (Space) chạy nhiều bước rồi mới vẽ
+TURBO_FPS = 60
+TURBO_STEPS_PER_FRAME = 250
+
+# Tệp lưu chính sách đã học, được nạp lại khi khởi động
+CHECKPOINT = "shepherd.mcs"
+# Số liệu đo hiệu năng (phím I) được ghi ra tệp này khi thoát
+PROFILE_OUTPUT = "profile.json"
+
+
+def _pyplot():
+    """matplotlib chỉ được import khi mở biểu đồ lần đầu"""
+    import matplotlib
+    matplotlib.use('Qt5Agg')  # Chuyển sang Qt5Agg để tránh lỗi Tkinter
+    import matplotlib.pyplot as plt
+    return plt
+
+
+class StepsPlot:
+    """Biểu đồ số bước để bắt cừu, đọc dần từ CatchLog và giữ số nhóm cố định"""
+
+    def __init__(self, catch_log):
+        self.catch_log = catch_log
+        self.reader = CatchLogReader(catch_log.directory)
+        self.sampler = Downsampler(buckets=1000)
+        self.shown = False
+
+    def show(self):
+        """Hiển thị biểu đồ với trục x là lần bắt được cừu và trục y là số bước (min/max và trung bình theo nhóm)"""
+        self.catch_log.flush()
+        self.sampler.extend(self.reader.read_new(["steps"])["steps"])
+        if self.sampler.rows:  # Chỉ vẽ nếu có dữ liệu
+            plt = _pyplot()
+            x, low, high, mean = self.sampler.series()
+            plt.figure(figsize=(8, 5))
+            plt.xlabel("Lần bắt được cừu")
+            plt.ylabel("Số bước")
+            plt.title("Số bước để bắt được cừu qua từng lần")
+            plt.grid(True)
+            plt.fill_between(x, low, high, color='purple', alpha=0.25, label=f"Min/max mỗi {self.sampler.width} lần")
+            plt.plot(x, mean, label="Steps", color='purple')
+            plt.xlim(0, max(self.sampler.rows - 1, 0))
+            plt.ylim(0, high.max())
+            plt.legend()
+            plt.show(block=False)
+            plt.pause(0.01)  # Đảm bảo biểu đồ hiển thị
+            self.shown = True
+        else:
+            print("Không có dữ liệu để hiển thị biểu đồ. Hãy bắt cừu trước!")
+
+    def hide(self):
+        """Đóng biểu đồ một cách an toàn"""
+        if self.shown:
+            try:
+                _pyplot().close('all')
+                self.shown = False
+            except Exception as e:
+                print("Lỗi khi đóng biểu đồ:", e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m montecarlo play", description="Chơi và quan sát người chăn cừu học")
+    parser.add_argument("--checkpoint", default=CHECKPOINT, help="checkpoint được nạp khi khởi động và lưu bằng phím K")
+    parser.add_argument("--grid-side", type=int, default=16, help="số ô mỗi cạnh sân")
+    parser.add_argument("--sheep", type=int, default=1, help="số cừu trên sân cùng lúc")
+    parser.add_argument("--record", default=None, help="ghi mọi ván đã chơi vào thư mục này")
+    parser.add_argument("--gamma", type=float, default=0.78, help="hệ số chiết khấu khi chưa có checkpoint")
+    args = parser.parse_args(argv)
+    if args.sheep < 1:
+        # Đặc trưng hướng cừu của State cần ít nhất một con cừu để chỉ tới
+        parser.error("--sheep phải >= 1")
+    checkpoint_path = args.checkpoint
+
+    # Khởi tạo Pygame
+    pygame.init()
+
+    canvas = pygame.display.set_mode((1200, 800))
+    pygame.display.set_caption("Shepherd Game with Explanation")
+
+    grid = Grid(args.grid_side, 800)
+    cell = max(1, int(grid.ratio))
+
+    # Tải sprite
+    try:
+        sheep_sprite = pygame.image.load(os.path.join(SPRITES, "Sheep.jpg"))
+        shepperd_sprite = pygame.image.load(os.path.join(SPRITES, "Shepperd.jpg"))
+        cheese_sprite = pygame.image.load(os.path.join(SPRITES, "Cheese.jpg"))
+        shepperd_sprite = pygame.transform.scale(shepperd_sprite, (cell, cell))
+        sheep_sprite = pygame.transform.scale(sheep_sprite, (cell, cell))
+        cheese_sprite = pygame.transform.scale(cheese_sprite, (cell, cell))
+    except pygame.error as e:
+        pygame.quit()
+        return
+
+    FPS = 10
+    STEPS_PER_FRAME = 1
+    instrument.dump_at_exit(PROFILE_OUTPUT)
+
+    # Thống kê mỗi lần bắt được cừu được ghi dần ra đĩa; biểu đồ chỉ giữ một số nhóm cố định
+    catch_log = CatchLog(os.path.join("logs", time.strftime("catches-%Y%m%d-%H%M%S")))
+    steps_plot = StepsPlot(catch_log)
+
+    renderer = Renderer(canvas, grid, shepperd_sprite, sheep_sprite, cheese_sprite)
+    shepperd = Shepperd(0, 5, grid)
+    # Chỉ mục không gian của đàn cừu, đặc trưng hướng cừu của State lấy theo con gần nhất
+    flock = Flock(grid, args.sheep)
+    brain = checkpoint.load(checkpoint_path) if os.path.exists(checkpoint_path) else Brain(gamma=args.gamma)
+    brain.current_policy.verbose = True
+    if args.record:
+        brain.recorder = TrajectoryRecorder(args.record)
+    # Giải thích được tính ở luồng nền để vòng lặp game không bị chặn
+    explainer = ExplanationService(brain)
+
+    running = True
+    paused = False
+    print_state = False
+    print_policy = False
+    manual = False
+    show_explanation = False
+
+    # Đuôi lưu 200 vị trí gần nhất trong bộ đệm vòng kèm lưới chiếm chỗ
+    tail = Tail(grid.grid_side, capacity=200)
+    tail.push(shepperd.x_cell, shepperd.y_cell)
+    past_directions = deque(maxlen=99)
+    direction = Direction.RIGHT
+    current_explanation = ""
+    last_explanation = ""
+
+    # Biến đếm bước
+    step_count = 0
+    episode_steps = 0
+    frame_count = 0
+    profile_overlay = ""
+
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    turbo = STEPS_PER_FRAME == 1
+                    FPS = TURBO_FPS if turbo else 10
+                    STEPS_PER_FRAME = TURBO_STEPS_PER_FRAME if turbo else 1
+                elif event.key == pygame.K_f:
+                    print_state = not print_state
+                elif event.key == pygame.K_p:
+                    print_policy = not print_policy
+                elif event.key == pygame.K_m:
+                    manual = not manual
+                elif event.key == pygame.K_e:
+                    show_explanation = not show_explanation
+                    if show_explanation:
+                        current_explanation = "Giải thích SHAP đã bật\nNhấn E để tắt"
+                    else:
+                        explainer.clear()
+                        current_explanation = ""
+                        last_explanation = ""
+                elif event.key == pygame.K_RETURN:  # Tạm dừng/tiếp tục
+                    if paused:
+                        paused = False
+                        steps_plot.hide()  # Đóng biểu đồ khi tiếp tục
+                    else:
+                        paused = True
+                elif event.key == pygame.K_i:  # Bật/tắt đo hiệu năng và bảng số liệu
+                    instrument.enable(not instrument.enabled())
+                    profile_overlay = ""
+                elif event.key == pygame.K_k:  # Lưu chính sách đã học
+                    checkpoint.save(checkpoint_path, brain)
+                    print("Đã lưu chính sách vào " + checkpoint_path)
+                elif event.key == pygame.K_q :  # Hiển thị biểu đồ và tạm dừng
+                    paused = True
+                    steps_plot.show()
+                elif manual and not paused:
+                    if event.key == pygame.K_a and direction != Direction.RIGHT:
+                        direction = Direction.LEFT
+                    elif event.key == pygame.K_w and direction != Direction.DOWN:
+                        direction = Direction.UP
+                    elif event.key == pygame.K_d and direction != Direction.LEFT:
+                        direction = Direction.RIGHT
+                    elif event.key == pygame.K_s and direction != Direction.UP:
+                        direction = Direction.DOWN
+
+        for _ in range(0 if paused else STEPS_PER_FRAME):
+            step_count += 1
+            episode_steps += 1
+
+            if not manual:
+                nearest_sheep = flock.nearest(shepperd.x_cell, shepperd.y_cell)
+                state = State(shepperd.get_sheep_direction(nearest_sheep), tail.facing_queue(shepperd.x_cell, shepperd.y_cell, direction))
+                if print_state:
+                    print(state)
+                direction = brain.choose_direction(state, direction)
+                if show_explanation:
+                    explainer.submit(state, direction, direction)
+                    new_explanation = explainer.latest()
+                    if new_explanation and new_explanation != last_explanation:
+                        current_explanation = new_explanation
+                        last_explanation = new_explanation
+            else:
+                if show_explanation:
+                    new_explanation = "Chế độ thủ công: Dùng A/W/D/S để di chuyển"
+                    if new_explanation != last_explanation:
+                        current_explanation = new_explanation
+                        last_explanation = new_explanation
+
+            past_directions.appendleft(direction)
+
+            shepperd.move(direction)
+
+            caught_sheep = flock.at(shepperd.x_cell, shepperd.y_cell)
+            if caught_sheep is not None:
+                flock.respawn(caught_sheep)
+                shepperd.sheeps += 1
+                tail.grow()
+                brain.add_reward(50)
+                catch_log.append(step_count, episode_steps, brain.current_policy.exploration, shepperd.sheeps)
+                step_count = 0
+            else:
+                brain.add_reward(-1)
+
+            with instrument.section("game.collision"):
+                collided = tail.occupied(shepperd.x_cell, shepperd.y_cell)
+            if collided:
+                shepperd = Shepperd(0, 5, grid)
+                flock.reset()
+                tail.reset()
+                brain.add_reward(-300)
+                brain.evaluate()
+                step_count = 0
+                episode_steps = 0
+
+            tail.push(shepperd.x_cell, shepperd.y_cell)
+
+            if print_policy:
+                print(brain.current_policy)
+
+        frame_count += 1
+        if instrument.enabled() and frame_count % 30 == 0:
+            profile_overlay = "\n".join(instrument.format_lines())
+        renderer.draw(shepperd, tail.positions(1, shepperd.sheeps + 1), flock, current_explanation, paused,
+                      profile_overlay)
+        renderer.tick(FPS)
+
+    explainer.stop()
+    catch_log.close()
+    if brain.recorder is not None:
+        brain.recorder.close()
+    pygame.quit()
+    steps_plot.hide()  # Đảm bảo đóng biểu đồ khi thoát
+
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,199 @@
-from .state import State
+import numpy as np
+from .state import State, StateEncoder, N_STATES, N_ACTIONS
 from .game.direction import Direction
-from random import choices
-from typing import Dict
+from .instrument import timed
+
+# Giá trị trong Policy.policy khi trạng thái chưa có hành động tham lam
+NO_ACTION = -1
+
+# Các hướng được phép theo hướng hiện tại, tính sẵn thay vì gọi Direction.get_available() mỗi bước
+AVAILABLE_DIRECTIONS = [Direction(current).get_available() for current in range(N_ACTIONS)]
+AVAILABLE = np.array([[d.value for d in available] for available in AVAILABLE_DIRECTIONS], dtype=np.int64)
+
+# Số số ngẫu nhiên được sinh mỗi lần cho get_action
+UNIFORM_BLOCK = 4096
+
+
+# Hệ số làm mượt của tỷ lệ đổi hành động tham lam mỗi lần một trạng thái được cải thiện
+CHURN_SMOOTHING = 0.1
+
+
+def sampling_table(exploration):
+    """Bảng phân phối tích lũy [hướng hiện tại, hành động tham lam, 3 hướng được phép].
+    Hàng cuối (chỉ số NO_ACTION = -1) và trường hợp hành động tham lam là hướng ngược lại đều là phân phối đều.
+    exploration có thể là mảng (ví dụ một giá trị mỗi trạng thái), khi đó bảng có thêm các chiều đầu tương ứng"""
+    exploration = np.asarray(exploration, dtype=np.float64)[..., None, None, None]
+    is_greedy = AVAILABLE[:, None, :] == np.arange(N_ACTIONS + 1)[:, None]
+    has_greedy = is_greedy.any(axis=-1, keepdims=True)
+    weights = np.where(has_greedy, np.where(is_greedy, 1 - exploration, exploration / 2), 1.0)
+    return np.cumsum(weights, axis=-1) / weights.sum(axis=-1, keepdims=True)
+
+
+def uncertainty(rewards, counts, squares):
+    """Mức chưa chắc chắn của hành động tham lam mỗi trạng thái trong [0, 1]: se / (se + khoảng cách), với khoảng cách
+    giữa hai hành động tốt nhất và se là sai số chuẩn của hiệu hai ước lượng. Bằng 1 khi mới thử ít hơn hai hành động"""
+    visited = counts > 0
+    variance = np.divide(squares, counts - 1, out=np.full_like(squares, np.inf), where=counts > 1)
+    error = np.divide(variance, counts, out=np.full_like(squares, np.inf), where=visited)
+    order = np.argsort(np.where(visited, rewards, -np.inf), axis=1)
+    best = order[:, -1:]
+    second = order[:, -2:-1]
+    gap = (np.take_along_axis(rewards, best, 1) - np.take_along_axis(rewards, second, 1))[:, 0]
+    se = np.sqrt(np.take_along_axis(error, best, 1) + np.take_along_axis(error, second, 1))[:, 0]
+    enough = visited.sum(axis=1) >= 2
+    result = np.ones(len(rewards))
+    finite = enough & np.isfinite(se)
+    result[finite] = se[finite] / np.maximum(se[finite] + gap[finite], 1e-12)
+    return result
+
 
 class Policy:
-    def __init__(self):
-        self.policy: Dict[State, Direction] = {}
-        self.exploration = 0.3
+    def __init__(self, seed=None, exploration=0.3, decay=0.001, adaptive=False):
+        self.policy = np.full(N_STATES, NO_ACTION, dtype=np.int8)
+        self.exploration = exploration
+        # Lượng tỷ lệ khám phá giảm đi sau mỗi ván
+        self.decay = decay
+        # Chế độ thích nghi: mỗi trạng thái có tỷ lệ khám phá riêng theo độ xáo trộn và độ chưa chắc chắn,
+        # thay cho lịch giảm tuyến tính. initial_exploration là mức trần
+        self.adaptive = adaptive
+        self.initial_exploration = exploration
+        self.state_exploration = None
+        # Trung bình trượt của việc hành động tham lam thay đổi, theo từng trạng thái
+        self.churn = np.ones(N_STATES)
+        # Số ván liên tiếp gần nhất không có hành động tham lam nào thay đổi
+        self.stable_episodes = 0
         self.improvements = 0
-        
+        # Tăng mỗi khi một hành động tham lam thay đổi, dùng để làm mất hiệu lực bộ đệm giải thích
+        self.version = 0
+        # In tỷ lệ khám phá sau mỗi lần cải thiện
+        self.verbose = False
+        self.rng = np.random.default_rng(seed)
+        self._uniforms = []
+        self._next = 0
+        self._table_exploration = None
+        self._table_states = None
+
+    def _table(self):
+        if self.state_exploration is not None:
+            return self._state_table()
+        if self._table_exploration != self.exploration:
+            self._table_exploration = self.exploration
+            self._cumulative = sampling_table(self.exploration)
+            self._cumulative_lists = self._cumulative.tolist()
+        return self._cumulative
+
+    def _state_table(self):
+        if self._table_states is not self.state_exploration:
+            self._table_states = self.state_exploration
+            self._cumulative = sampling_table(self.state_exploration)
+            self._cumulative_lists = self._cumulative.tolist()
+        return self._cumulative
+
+    def set_state_exploration(self, exploration):
+        """Dùng tỷ lệ khám phá riêng cho từng trạng thái (None để quay về tỷ lệ chung self.exploration)"""
+        self.state_exploration = None if exploration is None else np.array(exploration, dtype=np.float64)
+        # Bảng đang lưu không còn đúng cho chế độ nào
+        self._table_exploration = None
+        self._table_states = None
+
+    def greedy(self):
+        """Policy không khám phá (kể cả ở chế độ thích nghi) dùng chung bảng hành động tham lam và rng với policy này,
+        còn policy này không bị đổi. Trạng thái chưa có hành động tham lam vẫn chọn ngẫu nhiên"""
+        frozen = Policy(exploration=0.0, decay=0.0)
+        frozen.policy = self.policy
+        frozen.rng = self.rng
+        frozen.version = self.version
+        return frozen
+
+    def _uniform(self):
+        if self._next == len(self._uniforms):
+            self._uniforms = self.rng.random(UNIFORM_BLOCK).tolist()
+            self._next = 0
+        u = self._uniforms[self._next]
+        self._next += 1
+        return u
+
     def get_action(self, state: State, current_direction: Direction):
-        available = current_direction.get_available()
-        if (not state in self.policy):
-            return choices(available)[0]
-        weights = [self.exploration / 2, self.exploration / 2, self.exploration / 2]
-        try:
-            weights[available.index(self.policy[state])] = 1 - self.exploration
-            return choices(available, weights=weights)[0]
-        except:
-            return choices(available)[0]
-        
-    
-    
-    def improve(self, rewards):
-        for state in rewards.keys():
-            isUniformDistribution = True
-
-            actions = list(rewards[state].keys())
-
-            best_reward = rewards[state][actions[0]]["reward"]
-            best_action = actions[0]
-
-            for i in range(1, len(actions)):
-                average_reward = rewards[state][actions[i]]["reward"]
-                if (average_reward > best_reward):
-                    best_reward = average_reward
-                    best_action = actions[i]
-                    isUniformDistribution = False
-                elif (average_reward < best_reward):
-                    isUniformDistribution = False
-            if (not isUniformDistribution):
-                self.policy[state] = best_action
-        if (self.exploration > 0):
-            self.exploration -= 0.001
-        if (self.exploration < 0):
-            self.exploration = 0
-        print("Exploration rate: " + str(self.exploration))
+        return self.get_encoded_action(StateEncoder.encode(state), current_direction)
+
+    def get_encoded_action(self, code, current_direction: Direction):
+        self._table()
+        if self.state_exploration is None:
+            cumulative = self._cumulative_lists[current_direction.value][self.policy.item(code)]
+        else:
+            cumulative = self._cumulative_lists[code][current_direction.value][self.policy.item(code)]
+        u = self._uniform()
+        return AVAILABLE_DIRECTIONS[current_direction.value][(u >= cumulative[0]) + (u >= cumulative[1])]
+
+    def get_actions(self, codes, current_directions):
+        """Chọn hành động cho nhiều trạng thái cùng lúc, trả về mảng Direction.value"""
+        table = self._table()
+        if self.state_exploration is None:
+            cumulative = table[current_directions, self.policy[codes]]
+        else:
+            cumulative = table[codes, current_directions, self.policy[codes]]
+        u = self.rng.random(len(codes))
+        index = (u >= cumulative[:, 0]).astype(np.int64) + (u >= cumulative[:, 1])
+        return AVAILABLE[current_directions, index]
+
+    @timed("policy.improve")
+    def improve(self, rewards, counts, states=None, episodes=1, squares=None):
+        """Cập nhật hành động tham lam cho các trạng thái `states` (mặc định là mọi trạng thái).
+        Policy.policy đóng vai trò bộ đệm hành động tốt nhất nên các trạng thái khác giữ nguyên.
+        squares (tổng bình phương độ lệch của Brain) chỉ cần cho chế độ thích nghi"""
+        if states is None:
+            states = np.arange(len(self.policy))
+        touched = states
+        visited = counts[states] > 0
+        best_reward = np.where(visited, rewards[states], -np.inf)
+        worst_reward = np.where(visited, rewards[states], np.inf).min(axis=1)
+        best_action = best_reward.argmax(axis=1)
+        # Chỉ cập nhật những trạng thái mà các hành động đã thử không có cùng phần thưởng
+        isNotUniform = best_reward.max(axis=1) > worst_reward
+        states = states[isNotUniform]
+        best_action = best_action[isNotUniform]
+        changed = self.policy[states] != best_action
+        if changed.any():
+            self.policy[states] = best_action
+            self.version += 1
+            self.stable_episodes = 0
+        else:
+            self.stable_episodes += episodes
+        self.churn[touched] *= 1 - CHURN_SMOOTHING
+        self.churn[states[changed]] += CHURN_SMOOTHING
+
+        if self.adaptive:
+            self._adapt(rewards, counts, squares)
+        else:
+            if (self.exploration > 0):
+                self.exploration -= self.decay * episodes
+            if (self.exploration < 0):
+                self.exploration = 0
+        if (self.verbose):
+            print("Exploration rate: " + str(self.exploration))
+
+    def _adapt(self, rewards, counts, squares):
+        """Tỷ lệ khám phá mỗi trạng thái = mức trần × max(độ xáo trộn, độ chưa chắc chắn); trạng thái được thăm nhiều
+        có sai số chuẩn nhỏ dần nên tỷ lệ khám phá giảm theo số lần thăm. self.exploration là trung bình theo số lần thăm"""
+        if squares is None:
+            squares = np.zeros_like(rewards)
+        signal = np.maximum(self.churn, uncertainty(rewards, counts, squares))
+        self.set_state_exploration(self.initial_exploration * signal)
+        visits = counts.sum(axis=1)
+        if visits.any():
+            self.exploration = float(np.average(self.state_exploration, weights=visits))
+
+    def converged(self, patience):
+        """Chính sách được coi là ổn định khi không hành động tham lam nào đổi trong `patience` ván liên tiếp"""
+        return self.stable_episodes >= patience
 
     def __str__(self):
         s = "--------------------------\n"
 
-        for state in self.policy.keys():
-            s += str(state) + "\n"
-            s += str(self.policy[state]) + "\n\n"
+        for code in np.flatnonzero(self.policy != NO_ACTION):
+            s += str(StateEncoder.decode(code)) + "\n"
+            s += str(Direction(int(self.policy[code]))) + "\n\n"
 
         s += "---------------------------\n"
-            
-        return s
\ No newline at end of file
+
+        return s
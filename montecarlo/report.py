@@ -0,0 +1,135 @@
+import argparse
+import csv
+import json
+import os
+import time
+import numpy as np
+from . import checkpoint
+from .explain import shapley_table
+from .policy import NO_ACTION
+from .state import StateEncoder, N_STATES, N_ACTIONS
+from .trajectory import recordings
+from .game.direction import Direction
+
+
+def count_pairs(readers, batch_steps=1 << 22):
+    """Đếm số lần mỗi cặp (trạng thái, hành động đã ghi) xuất hiện trong các bản ghi, đọc từng lô `batch_steps` bước
+    nên bộ nhớ không phụ thuộc độ dài bản ghi. Trả về mảng (N_STATES, N_ACTIONS); tổng theo hàng là số lần
+    mỗi trạng thái xuất hiện"""
+    counts = np.zeros(N_STATES * N_ACTIONS, dtype=np.int64)
+    for reader in readers:
+        states = reader.columns["state"]
+        actions = reader.columns["action"]
+        for start in range(0, reader.steps, batch_steps):
+            stop = min(start + batch_steps, reader.steps)
+            keys = states[start:stop].astype(np.int64) * N_ACTIONS + actions[start:stop]
+            counts += np.bincount(keys, minlength=N_STATES * N_ACTIONS)
+    return counts.reshape(N_STATES, N_ACTIONS)
+
+
+def _attribution(values, actions, weights):
+    """Độ quan trọng trung bình của hai đặc trưng khi giải thích `actions`, có trọng số `weights`"""
+    total = weights.sum()
+    magnitude = (np.abs(values) * weights[:, None]).sum(axis=0)
+    signed = (values * weights[:, None]).sum(axis=0)
+    per_action = {}
+    for action in range(N_ACTIONS):
+        taken = weights[actions == action].sum()
+        if taken:
+            chosen = values[actions == action]
+            per_action[Direction(action).name] = {
+                "steps": int(taken),
+                "mean_abs_sheep": float((np.abs(chosen[:, 0]) * weights[actions == action]).sum() / taken),
+                "mean_abs_queue": float((np.abs(chosen[:, 1]) * weights[actions == action]).sum() / taken),
+            }
+    return {
+        "mean_abs_sheep": float(magnitude[0] / total) if total else 0.0,
+        "mean_abs_queue": float(magnitude[1] / total) if total else 0.0,
+        "mean_sheep": float(signed[0] / total) if total else 0.0,
+        "mean_queue": float(signed[1] / total) if total else 0.0,
+        "sheep_share": float(magnitude[0] / magnitude.sum()) if magnitude.sum() else 0.0,
+        "per_action": per_action,
+    }
+
+
+def summarize(policy, counts):
+    """Độ quan trọng toàn cục của hai đặc trưng trong quyết định của chính sách: mỗi trạng thái đã ghi được giải thích
+    bằng hành động tham lam của policy, trọng số là số lần trạng thái xuất hiện. Hành động đã ghi (kể cả bước khám
+    phá) chỉ dùng cho các số liệu phụ. Giá trị Shapley chỉ được tính một lần cho mỗi cặp. Trả về (tóm tắt, bảng Shapley)"""
+    values = shapley_table(policy)
+    states = counts.sum(axis=1)
+    total = states.sum()
+    greedy = policy.policy.astype(np.int64)
+    codes = np.flatnonzero((greedy != NO_ACTION) & (states > 0))
+    agrees = counts[codes, greedy[codes]].sum()
+
+    logged_codes, logged_actions = np.nonzero(counts)
+    summary = {
+        "steps": int(total),
+        "distinct_states": int((states > 0).sum()),
+        "distinct_pairs": int((counts > 0).sum()),
+        # Bước ở trạng thái chưa có hành động tham lam thì không có quyết định nào để giải thích
+        "attributed_steps": int(states[codes].sum()),
+        "unattributed_steps": int(total - states[codes].sum()),
+        **_attribution(values[codes, greedy[codes]], greedy[codes], states[codes]),
+        "logged": {
+            "steps": int(total),
+            "greedy_agreement": float(agrees / total) if total else 0.0,
+            **_attribution(values[logged_codes, logged_actions], logged_actions, counts[logged_codes, logged_actions]),
+        },
+    }
+    return summary, values
+
+
+def write_report(directory, policy, counts, summary, values):
+    """Ghi summary.json và states.csv (mỗi dòng một trạng thái đã xuất hiện, nhiều nhất trước, kèm giá trị Shapley
+    của hành động tham lam)"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    states = counts.sum(axis=1)
+    codes = np.flatnonzero(states)
+    codes = codes[np.argsort(-states[codes], kind="stable")]
+    with open(os.path.join(directory, "states.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["state", "sheep_direction", "facing_queue", "greedy_action", "steps", "greedy_steps",
+                         "shap_sheep", "shap_queue"])
+        for code in codes.tolist():
+            state = StateEncoder.decode(code)
+            greedy = int(policy.policy[code])
+            has_greedy = greedy != NO_ACTION
+            writer.writerow([
+                code,
+                state.sheep_direction.name if state.sheep_direction else "",
+                " ".join(sorted(d.name for d in state.facing_queue)),
+                Direction(greedy).name if has_greedy else "",
+                int(states[code]),
+                int(counts[code, greedy]) if has_greedy else 0,
+                f"{values[code, greedy, 0]:.6f}" if has_greedy else "",
+                f"{values[code, greedy, 1]:.6f}" if has_greedy else "",
+            ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m montecarlo report",
+                                     description="Báo cáo giải thích toàn cục trên các ván đã ghi")
+    parser.add_argument("recordings", nargs="+", help="thư mục bản ghi (train --record / play --record)")
+    parser.add_argument("--policy", required=True, help="checkpoint có chính sách cần giải thích")
+    parser.add_argument("--output", default="report", help="thư mục ghi summary.json và states.csv")
+    parser.add_argument("--batch-steps", type=int, default=1 << 22, help="số bước đọc mỗi lô (giới hạn bộ nhớ)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    policy = checkpoint.load_policy(args.policy)
+    counts = count_pairs(recordings(args.recordings), args.batch_steps)
+    summary, values = summarize(policy, counts)
+    write_report(args.output, policy, counts, summary, values)
+    elapsed = time.perf_counter() - start
+    print(f"{summary['steps']} bước, {summary['distinct_pairs']} cặp (trạng thái, hành động) trong {elapsed:.1f}s")
+    print(f"Hướng cừu: {summary['mean_abs_sheep']:.4f}, hàng đợi: {summary['mean_abs_queue']:.4f} "
+          f"({summary['sheep_share']:.0%} độ quan trọng thuộc về hướng cừu)")
+    print(f"Hành động đã ghi trùng hành động tham lam ở {summary['logged']['greedy_agreement']:.0%} số bước")
+
+
+if __name__ == "__main__":
+    main()
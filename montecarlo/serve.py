@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import os
+import socket
+import struct
+import threading
+import numpy as np
+from .explain import shapley_table
+from .policy import AVAILABLE, NO_ACTION
+from .state import NO_SHEEP, N_QUEUES, N_STATES, N_ACTIONS
+
+MAGIC = b"MCSF"
+VERSION = 1
+PORT = 8765
+
+# Tệp chính sách đóng băng: bảng hành động phẳng và giá trị Shapley tính sẵn cho mọi (trạng thái, hành động)
+LAYOUT = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("reserved", "<u2"),
+    ("actions", "i1", (N_STATES * N_ACTIONS,)),
+    ("explanations", "<f4", (N_STATES, N_ACTIONS, 2)),
+], align=True)
+
+# Khung yêu cầu: (số truy vấn, cờ) rồi mỗi truy vấn 3 byte (hướng cừu, bitmask hàng đợi, hướng hiện tại).
+# Khung trả lời: (số truy vấn, trạng thái) rồi mỗi truy vấn 1 byte hành động, kèm 2 số f4 mỗi truy vấn nếu có cờ EXPLAIN
+FRAME = struct.Struct("<IB")
+QUERY_SIZE = 3
+EXPLAIN = 1
+OK = 0
+BAD_REQUEST = 1
+
+
+class FrozenPolicy:
+    """Chính sách tham lam chỉ đọc: actions[(code * N_ACTIONS) + hướng hiện tại] là hành động sẽ đi.
+
+    Trạng thái chưa có hành động tham lam, hoặc có nhưng là hướng ngược lại, thì đi tiếp hướng hiện tại
+    thay vì chọn ngẫu nhiên như Policy, nên cùng một truy vấn luôn cho cùng một câu trả lời.
+    """
+
+    def __init__(self, actions, explanations):
+        self.actions = actions
+        self.explanations = explanations
+
+    @classmethod
+    def from_policy(cls, policy):
+        greedy = np.repeat(policy.policy.astype(np.int64), N_ACTIONS)
+        current = np.tile(np.arange(N_ACTIONS), N_STATES)
+        allowed = (AVAILABLE[current] == greedy[:, None]).any(axis=1) & (greedy != NO_ACTION)
+        actions = np.where(allowed, greedy, current).astype(np.int8)
+
+        explanations = shapley_table(policy).astype(np.float32)
+        return cls(actions, explanations)
+
+    def save(self, path):
+        record = np.zeros((), dtype=LAYOUT)
+        record["magic"] = MAGIC
+        record["version"] = VERSION
+        record["actions"] = self.actions
+        record["explanations"] = self.explanations
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(record.tobytes())
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """Nạp tệp chính sách đóng băng, hoặc đóng băng ngay một checkpoint huấn luyện"""
+        with open(path, "rb") as f:
+            magic = f.read(4)
+        if magic != MAGIC:
+            from . import checkpoint
+            return cls.from_policy(checkpoint.load_policy(path))
+        record = np.memmap(path, dtype=LAYOUT, mode="r", shape=())
+        if record["version"] != VERSION:
+            raise ValueError(f"Phiên bản chính sách đóng băng {record['version']} không được hỗ trợ (cần {VERSION})")
+        return cls(record["actions"], record["explanations"])
+
+    def greedy(self):
+        """Đã không khám phá, cùng giao diện với Policy.greedy"""
+        return self
+
+    def get_actions(self, codes, current_directions):
+        """Cùng giao diện với Policy.get_actions (mã trạng thái và Direction.value hiện tại của nhiều ván)"""
+        return self.actions[np.asarray(codes, dtype=np.int64) * N_ACTIONS + current_directions].astype(np.int64)
+
+    def lookup(self, queries):
+        """queries là mảng (n, 3) uint8, trả về (hành động, giá trị Shapley (n, 2)) hoặc None nếu truy vấn sai"""
+        sheep = queries[:, 0].astype(np.int64)
+        queue = queries[:, 1].astype(np.int64)
+        current = queries[:, 2].astype(np.int64)
+        if (sheep > NO_SHEEP).any() or (queue >= N_QUEUES).any() or (current >= N_ACTIONS).any():
+            return None
+        code = sheep * N_QUEUES + queue
+        actions = self.actions[code * N_ACTIONS + current]
+        return actions, self.explanations[code, actions]
+
+
+class PolicyServer:
+    """Máy chủ TCP asyncio: mỗi kết nối gửi nhiều khung liên tiếp, các khung đến gần nhau từ mọi kết nối
+    được gộp thành một lô và tra bảng bằng một lần lập chỉ mục NumPy"""
+
+    def __init__(self, frozen, max_batch=65536, max_delay=0.0):
+        self.frozen = frozen
+        self.max_batch = max_batch
+        # Thời gian chờ thêm khung trước khi xử lý lô (giây), 0 thì chỉ gộp các khung đã có sẵn
+        self.max_delay = max_delay
+        self.queue = None
+        self.batches = 0
+        self.queries = 0
+        self.connections = {}
+
+    async def start(self, host="127.0.0.1", port=PORT):
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.get_running_loop().create_task(self._batch())
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def _handle(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                count, flags = FRAME.unpack(await reader.readexactly(FRAME.size))
+                body = await reader.readexactly(count * QUERY_SIZE)
+                future = asyncio.get_running_loop().create_future()
+                self.queue.put_nowait((np.frombuffer(body, dtype=np.uint8).reshape(count, QUERY_SIZE), flags, future))
+                writer.write(await future)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self.connections[asyncio.current_task()]
+            writer.close()
+
+    async def close(self):
+        """Đóng mọi kết nối đang mở, chờ các handler kết thúc rồi dừng bộ gộp lô"""
+        handlers = list(self.connections)
+        for writer in self.connections.values():
+            writer.close()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        self.batcher.cancel()
+        await asyncio.gather(self.batcher, return_exceptions=True)
+
+    async def _batch(self):
+        while True:
+            batch = [await self.queue.get()]
+            if self.max_delay:
+                await asyncio.sleep(self.max_delay)
+            size = len(batch[0][0])
+            while size < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                size += len(batch[-1][0])
+            self._answer(batch)
+
+    def _answer(self, batch):
+        self.batches += 1
+        queries = np.concatenate([item[0] for item in batch])
+        self.queries += len(queries)
+        result = self.frozen.lookup(queries)
+        if result is None:
+            # Có truy vấn sai trong lô: trả lời riêng từng khung để chỉ khung sai bị từ chối
+            if len(batch) > 1:
+                for item in batch:
+                    self._answer([item])
+                return
+            queries, flags, future = batch[0]
+            future.set_result(FRAME.pack(len(queries), BAD_REQUEST))
+            return
+        actions, explanations = result
+        start = 0
+        for queries, flags, future in batch:
+            stop = start + len(queries)
+            frame = FRAME.pack(len(queries), OK) + actions[start:stop].tobytes()
+            if flags & EXPLAIN:
+                frame += explanations[start:stop].tobytes()
+            future.set_result(frame)
+            start = stop
+
+
+class ServerThread:
+    """Chạy PolicyServer trong một luồng nền (dùng cho benchmark và khi nhúng vào tiến trình khác)"""
+
+    def __init__(self, frozen, host="127.0.0.1", port=0, **options):
+        self.server = PolicyServer(frozen, **options)
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.listener = self.loop.run_until_complete(self.server.start(host, port))
+            self.port = self.listener.sockets[0].getsockname()[1]
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name="policy-server", daemon=True)
+        self.thread.start()
+        started.wait()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def _shutdown(self):
+        self.listener.close()
+        await self.server.close()
+
+
+class PolicyClient:
+    """Client đồng bộ giữ một kết nối TCP cho mọi truy vấn"""
+
+    def __init__(self, host="127.0.0.1", port=PORT):
+        self.socket = socket.create_connection((host, port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _receive(self, size):
+        data = bytearray(size)
+        view = memoryview(data)
+        while size:
+            received = self.socket.recv_into(view, size)
+            if not received:
+                raise ConnectionError("Máy chủ đã đóng kết nối")
+            view = view[received:]
+            size -= received
+        return data
+
+    def query(self, sheep, queues, currents, explain=False):
+        """Hỏi hành động cho các truy vấn (hướng cừu hoặc NO_SHEEP, bitmask hàng đợi, Direction.value hiện tại).
+        Trả về mảng hành động, kèm mảng (n, 2) giá trị Shapley (hướng cừu, hàng đợi) nếu explain"""
+        queries = np.column_stack([sheep, queues, currents]).astype(np.uint8)
+        self.socket.sendall(FRAME.pack(len(queries), EXPLAIN if explain else 0) + queries.tobytes())
+        count, status = FRAME.unpack(self._receive(FRAME.size))
+        if status != OK:
+            raise ValueError("Máy chủ từ chối truy vấn không hợp lệ")
+        actions = np.frombuffer(self._receive(count), dtype=np.int8)
+        if not explain:
+            return actions
+        return actions, np.frombuffer(self._receive(count * 8), dtype="<f4").reshape(count, 2)
+
+    def close(self):
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+async def _serve(frozen, host, port, max_delay):
+    server = PolicyServer(frozen, max_delay=max_delay)
+    listener = await server.start(host, port)
+    print(f"Đang phục vụ chính sách tại {host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m montecarlo serve",
+                                     description="Phục vụ chính sách đóng băng qua TCP cho các tiến trình khác")
+    parser.add_argument("policy", help="checkpoint huấn luyện hoặc tệp chính sách đóng băng")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-delay", type=float, default=0.0, help="thời gian chờ gộp lô (giây)")
+    parser.add_argument("--export", default=None, help="chỉ ghi chính sách đóng băng ra tệp này rồi thoát")
+    args = parser.parse_args(argv)
+    frozen = FrozenPolicy.load(args.policy)
+    if args.export:
+        frozen.save(args.export)
+        return
+    try:
+        asyncio.run(_serve(frozen, args.host, args.port, args.max_delay))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+from multiprocessing import shared_memory
+import numpy as np
+from .policy import Policy, NO_ACTION
+from .state import N_STATES, N_ACTIONS
+
+
+def layout(shards):
+    """Bố cục vùng nhớ dùng chung: mỗi tiến trình học ghi vào shard riêng nên không cần khóa,
+    chính sách tham lam và tỷ lệ khám phá do tiến trình điều phối công bố"""
+    return np.dtype([
+        ("version", "<i8"),
+        ("exploration", "<f8"),
+        ("adaptive", "<i8"),
+        ("state_exploration", "<f8", (N_STATES,)),
+        ("policy", "i1", (N_STATES,)),
+        ("rewards", "<f8", (shards, N_STATES, N_ACTIONS)),
+        ("counts", "<i8", (shards, N_STATES, N_ACTIONS)),
+        ("squares", "<f8", (shards, N_STATES, N_ACTIONS)),
+    ], align=True)
+
+
+class SharedStatistics:
+    """Bảng (trung bình phần thưởng, số lần thăm, tổng bình phương độ lệch) đặt trong multiprocessing.shared_memory.
+
+    shard(i) trả về view (rewards, counts, squares) có cùng dạng các bảng của Brain, nên Brain của tiến trình học
+    cập nhật thẳng vào vùng nhớ dùng chung. reduce() gộp các shard khi đọc bằng trung bình có trọng số. Một shard
+    có thể đang được ghi dở lúc đọc (trung bình mới, số lần cũ); sai lệch đó chỉ tồn tại tới lần đọc sau.
+    """
+
+    def __init__(self, shards, name=None):
+        self.shards = shards
+        self.dtype = layout(shards)
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=self.dtype.itemsize)
+            self.owner = True
+        else:
+            # Tiến trình con dùng chung resource tracker với tiến trình tạo, chỉ tiến trình tạo giải phóng vùng nhớ
+            self.memory = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.record = np.ndarray((), dtype=self.dtype, buffer=self.memory.buf)
+        if self.owner:
+            self.record["policy"] = NO_ACTION
+            self.record["exploration"] = 0.3
+        self.policy = self.record["policy"]
+        self.rewards = self.record["rewards"]
+        self.counts = self.record["counts"]
+        self.squares = self.record["squares"]
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    @classmethod
+    def attach(cls, name, shards):
+        return cls(shards, name=name)
+
+    def shard(self, index):
+        return self.rewards[index], self.counts[index], self.squares[index]
+
+    def reduce(self):
+        """Bảng (trung bình, số lần, tổng bình phương độ lệch) của tất cả shard cộng lại"""
+        counts = self.counts.sum(axis=0)
+        totals = (self.rewards * self.counts).sum(axis=0)
+        rewards = np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+        squares = self.squares.sum(axis=0) + (self.counts * (self.rewards - rewards) ** 2).sum(axis=0)
+        return rewards, counts, squares
+
+    def publish(self, policy):
+        """Công bố tỷ lệ khám phá và phiên bản của policy (policy.policy đã là view của bảng dùng chung)"""
+        self.record["exploration"] = policy.exploration
+        self.record["adaptive"] = policy.state_exploration is not None
+        if policy.state_exploration is not None:
+            self.record["state_exploration"] = policy.state_exploration
+        self.record["version"] = policy.version
+
+    def reader(self, seed=None):
+        """Policy có policy.policy là view của vùng nhớ dùng chung, thấy ngay hành động tham lam mới"""
+        policy = Policy(seed)
+        policy.policy = self.policy
+        self.refresh(policy)
+        return policy
+
+    def refresh(self, policy):
+        """Cập nhật tỷ lệ khám phá và phiên bản (để bộ đệm giải thích biết chính sách đã đổi)"""
+        policy.exploration = float(self.record["exploration"])
+        if self.record["adaptive"]:
+            policy.set_state_exploration(self.record["state_exploration"])
+        policy.version = int(self.record["version"])
+
+    def close(self):
+        del self.policy, self.rewards, self.counts, self.squares, self.record
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
@@ -1,9 +1,40 @@
-from .game.direction import ComplexDirection
+from .game.direction import ComplexDirection, Direction
+
+# Chỉ số hướng cừu khi cừu nằm ngay dưới người chăn cừu (sheep_direction là None)
+NO_SHEEP = len(ComplexDirection)
+N_QUEUES = 1 << len(Direction)
+N_STATES = (len(ComplexDirection) + 1) * N_QUEUES
+N_ACTIONS = len(Direction)
 
 class StateAction:
-    def __init__(self, state, action):
-        self.state = state
-        self.action = action
+    """Cặp (trạng thái, hành động) bất biến, được dùng chung: StateAction(s, a) luôn trả về cùng một đối tượng"""
+
+    __slots__ = ("state", "action", "_hash")
+
+    def __new__(cls, state, action):
+        return _STATE_ACTIONS[state.code * N_ACTIONS + action.value]
+
+    @classmethod
+    def _create(cls, state, action):
+        self = object.__new__(cls)
+        object.__setattr__(self, "state", state)
+        object.__setattr__(self, "action", action)
+        object.__setattr__(self, "_hash", state.code * N_ACTIONS + action.value)
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError("StateAction là bất biến")
+
+    def __reduce__(self):
+        return StateAction, (self.state, self.action)
+
+    def __eq__(self, other):
+        if not isinstance(other, StateAction):
+            return NotImplemented
+        return self._hash == other._hash
+
+    def __hash__(self):
+        return self._hash
 
     def __str__(self):
         s = ""
@@ -11,28 +42,87 @@ class StateAction:
         s += str(self.action) + "\n"
         return s
 
+
+# Tập hướng bị chặn ứng với từng bitmask hàng đợi, dùng chung cho mọi State
+FACING_QUEUES = tuple(frozenset(d for d in Direction if mask & (1 << d.value)) for mask in range(N_QUEUES))
+_QUEUE_MASKS = {queue: mask for mask, queue in enumerate(FACING_QUEUES)}
+
+
+def queue_mask(facing_queue):
+    """Bitmask của một tập hướng bị chặn (tra bảng với tập đã dùng chung trong FACING_QUEUES)"""
+    mask = _QUEUE_MASKS.get(facing_queue) if isinstance(facing_queue, frozenset) else None
+    if mask is None:
+        mask = 0
+        for direction in facing_queue:
+            mask |= 1 << direction.value
+    return mask
+
+
 class State:
-    def __init__(self, sheep_direction: ComplexDirection, facing_queue):
-        self.sheep_direction = sheep_direction
-        self.facing_queue = facing_queue
+    """Trạng thái bất biến, được dùng chung theo (hướng cừu, bitmask hàng đợi): State(...) với cùng đặc trưng
+    luôn trả về cùng một đối tượng, có sẵn mã StateEncoder và giá trị băm nên không tốn cấp phát hay băm mỗi bước"""
+
+    __slots__ = ("sheep_direction", "facing_queue", "code")
+
+    def __new__(cls, sheep_direction: ComplexDirection, facing_queue):
+        sheep = NO_SHEEP if sheep_direction is None else sheep_direction.value
+        return _STATES[sheep * N_QUEUES + queue_mask(facing_queue)]
+
+    @classmethod
+    def _create(cls, code):
+        sheep, mask = divmod(code, N_QUEUES)
+        self = object.__new__(cls)
+        object.__setattr__(self, "sheep_direction", None if sheep == NO_SHEEP else ComplexDirection(sheep))
+        object.__setattr__(self, "facing_queue", FACING_QUEUES[mask])
+        object.__setattr__(self, "code", code)
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError("State là bất biến")
+
+    def __reduce__(self):
+        return StateEncoder.decode, (self.code,)
 
     def as_attack(self):
-        return State(self.sheep_direction, set())
+        return State(self.sheep_direction, FACING_QUEUES[0])
     
     def as_defense(self):
         return State(ComplexDirection.LEFT, self.facing_queue)
     
     def __eq__(self, other):
-        return self.sheep_direction == other.sheep_direction and self.facing_queue == other.facing_queue
+        if not isinstance(other, State):
+            return NotImplemented
+        return self.code == other.code
     
     def __hash__(self):
-        return hash((self.sheep_direction, tuple(self.facing_queue)))
+        return self.code
         
     def __str__(self):
         str_facing_queue = ""
-        for direction in self.facing_queue:
+        for direction in sorted(self.facing_queue, key=lambda d: d.value):
             str_facing_queue += str(direction) + " "
         s = ""
         s += "Sheep on: " + str(self.sheep_direction) + "\n"
         s += "Facing queue: " + str_facing_queue + "\n"
-        return s
\ No newline at end of file
+        return s
+
+
+_STATES = tuple(State._create(code) for code in range(N_STATES))
+_STATE_ACTIONS = tuple(StateAction._create(state, direction) for state in _STATES for direction in Direction)
+
+
+class StateEncoder:
+    """Ánh xạ State sang số nguyên liên tục trong [0, N_STATES) và ngược lại"""
+
+    @staticmethod
+    def encode(state):
+        return state.code
+
+    @staticmethod
+    def encode_arrays(sheep_directions, queue_masks):
+        """Mã hóa quan sát dạng mảng (ví dụ từ BatchEnv) mà không tạo State"""
+        return sheep_directions * N_QUEUES + queue_masks
+
+    @staticmethod
+    def decode(code):
+        return _STATES[int(code)]
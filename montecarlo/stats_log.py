@@ -0,0 +1,149 @@
+import os
+import numpy as np
+
+# Mỗi cột là một tệp nhị phân chỉ ghi nối tiếp trong thư mục log
+COLUMNS = {
+    "steps": np.dtype("<i4"),           # số bước từ lần bắt cừu trước
+    "episode_length": np.dtype("<i4"),  # số bước từ đầu ván tới lần bắt này
+    "exploration": np.dtype("<f4"),     # tỷ lệ khám phá lúc bắt
+    "tail_length": np.dtype("<i4"),     # độ dài đuôi sau khi bắt
+}
+
+
+class CatchLog:
+    """Ghi thống kê bắt cừu theo cột, đệm thành từng khối rồi nối vào cuối tệp"""
+
+    def __init__(self, directory, chunk=4096):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk = chunk
+        self.buffers = {name: np.zeros(chunk, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.pending = 0
+
+    def append(self, steps, episode_length, exploration, tail_length):
+        row = self.pending
+        self.buffers["steps"][row] = steps
+        self.buffers["episode_length"][row] = episode_length
+        self.buffers["exploration"][row] = exploration
+        self.buffers["tail_length"][row] = tail_length
+        self.pending += 1
+        if self.pending == self.chunk:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        for name, buffer in self.buffers.items():
+            with open(os.path.join(self.directory, name + ".bin"), "ab") as f:
+                f.write(buffer[:self.pending].tobytes())
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+
+
+class CatchLogReader:
+    """Đọc dần log: read_new() chỉ trả về các dòng được ghi thêm kể từ lần đọc trước"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.offset = 0
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + ".bin")
+
+    def __len__(self):
+        rows = []
+        for name, dtype in COLUMNS.items():
+            path = self._path(name)
+            rows.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        # Các cột có thể lệch nhau trong lúc một khối đang được ghi
+        return min(rows)
+
+    def read_new(self, columns=None, limit=None):
+        stop = len(self)
+        if limit is not None:
+            stop = min(stop, self.offset + limit)
+        count = stop - self.offset
+        data = {}
+        for name in columns or COLUMNS:
+            dtype = COLUMNS[name]
+            data[name] = np.fromfile(self._path(name), dtype=dtype, count=count,
+                                     offset=self.offset * dtype.itemsize) if count else np.zeros(0, dtype)
+        self.offset = stop
+        return data
+
+    def column(self, name):
+        """Ánh xạ toàn bộ một cột (chỉ đọc) để phân tích"""
+        return np.memmap(self._path(name), dtype=COLUMNS[name], mode="r", shape=(len(self),))
+
+
+class Downsampler:
+    """Giữ tối đa `buckets` nhóm (min, max, tổng, số lượng) liên tiếp; khi đầy thì gộp từng cặp nhóm
+    và nhân đôi độ rộng, nên bộ nhớ và chi phí vẽ không phụ thuộc độ dài log"""
+
+    def __init__(self, buckets=1000):
+        if buckets < 2 or buckets % 2:
+            # _compact gộp từng cặp nhóm nên số nhóm phải chẵn
+            raise ValueError(f"Số nhóm phải là số chẵn >= 2, nhận {buckets}")
+        self.buckets = buckets
+        self.width = 1
+        self.rows = 0
+        self.low = np.full(buckets, np.inf)
+        self.high = np.full(buckets, -np.inf)
+        self.total = np.zeros(buckets)
+        self.count = np.zeros(buckets, dtype=np.int64)
+
+    def _compact(self):
+        half = self.buckets // 2
+        self.low[:half] = np.minimum(self.low[0::2], self.low[1::2])
+        self.high[:half] = np.maximum(self.high[0::2], self.high[1::2])
+        self.total[:half] = self.total[0::2] + self.total[1::2]
+        self.count[:half] = self.count[0::2] + self.count[1::2]
+        self.low[half:] = np.inf
+        self.high[half:] = -np.inf
+        self.total[half:] = 0
+        self.count[half:] = 0
+        self.width *= 2
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        i = 0
+        while i < len(values):
+            bucket, filled = divmod(self.rows, self.width)
+            if bucket >= self.buckets:
+                self._compact()
+                continue
+            if filled:
+                # Lấp nốt nhóm đang dở
+                take = min(self.width - filled, len(values) - i)
+                self._add(bucket, values[i:i + take])
+            else:
+                # Các nhóm đầy đủ được xử lý cùng lúc
+                whole = min((len(values) - i) // self.width, self.buckets - bucket)
+                if whole:
+                    take = whole * self.width
+                    block = values[i:i + take].reshape(whole, self.width)
+                    end = bucket + whole
+                    self.low[bucket:end] = block.min(axis=1)
+                    self.high[bucket:end] = block.max(axis=1)
+                    self.total[bucket:end] = block.sum(axis=1)
+                    self.count[bucket:end] = self.width
+                else:
+                    take = len(values) - i
+                    self._add(bucket, values[i:])
+            i += take
+            self.rows += take
+
+    def _add(self, bucket, segment):
+        self.low[bucket] = min(self.low[bucket], segment.min())
+        self.high[bucket] = max(self.high[bucket], segment.max())
+        self.total[bucket] += segment.sum()
+        self.count[bucket] += len(segment)
+
+    def series(self):
+        """Trả về (vị trí giữa nhóm, min, max, trung bình) của các nhóm đã có dữ liệu"""
+        used = -(-self.rows // self.width)
+        count = self.count[:used]
+        x = np.arange(used) * self.width + (count - 1) / 2
+        return x, self.low[:used], self.high[:used], self.total[:used] / count
@@ -0,0 +1,171 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import random
+import time
+from .brain import Brain
+from .evaluate import evaluate, summarize
+from .game.env import BatchEnv
+from .train import collect_episodes
+
+# Tăng khi cách chạy một thử nghiệm thay đổi để kết quả cũ trong bộ đệm không còn được dùng
+CACHE_VERSION = 3
+
+# Tham số được quét và giá trị mặc định (giống trò chơi gốc)
+PARAMETERS = {
+    "gamma": 0.78,
+    "catch_reward": 50,
+    "step_reward": -1,
+    "death_reward": -300,
+    "exploration": 0.3,
+    "decay": 0.001,
+}
+
+
+def config_key(config):
+    """Băm cấu hình (kể cả ngân sách và seed) thành tên tệp trong bộ đệm"""
+    payload = json.dumps({"version": CACHE_VERSION, **config}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def run_trial(config):
+    """Huấn luyện không giao diện trong một tiến trình với ngân sách `episodes` ván,
+    rồi đánh giá chính sách tham lam. Trả về (config, số liệu)"""
+    start = time.perf_counter()
+    brain = Brain(config["gamma"], seed=config["seed"])
+    policy = brain.current_policy
+    policy.exploration = config["exploration"]
+    policy.decay = config["decay"]
+    env = BatchEnv(config["games"], catch_reward=config["catch_reward"], step_reward=config["step_reward"],
+                   death_reward=config["death_reward"], seed=config["seed"])
+    histories = [[] for _ in range(config["games"])]
+    backlog = []
+    episodes = 0
+    steps = 0
+    while episodes < config["episodes"]:
+        # Lô cuối chỉ lấy phần ngân sách còn lại để mọi thử nghiệm học đúng `episodes` ván
+        finished, collected = collect_episodes(brain, env, histories,
+                                               min(config["sync_episodes"], config["episodes"] - episodes), backlog,
+                                               config["max_steps"])
+        brain.evaluate_batch(finished)
+        episodes += len(finished)
+        steps += collected
+
+    summary = summarize(evaluate(policy, episodes=config["eval_episodes"], games=config["games"],
+                                 max_steps=config["max_steps"], seed=config["seed"]))
+    summary["catch_rate"] = summary["mean_catches"] / summary["mean_episode_length"]
+    summary["train_episodes"] = episodes
+    summary["train_steps"] = steps
+    summary["seconds"] = time.perf_counter() - start
+    return config, summary
+
+
+def grid_configs(space):
+    """Mọi tổ hợp của các danh sách giá trị trong `space`"""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_configs(space, trials, seed=None):
+    """`trials` cấu hình ngẫu nhiên: giá trị dạng (thấp, cao) được lấy đều trong khoảng, danh sách thì chọn một phần tử"""
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(trials):
+        config = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                config[name] = rng.randint(low, high) if isinstance(low, int) else rng.uniform(low, high)
+            else:
+                config[name] = rng.choice(values)
+        configs.append(config)
+    return configs
+
+
+def sweep(configs, cache="sweeps", workers=None):
+    """Chạy các cấu hình chưa có trong bộ đệm trên một pool tiến trình, ghi từng kết quả ngay khi xong.
+    Trả về danh sách (config, số liệu) của mọi cấu hình"""
+    os.makedirs(cache, exist_ok=True)
+    results = {}
+    pending = []
+    for config in configs:
+        key = config_key(config)
+        path = os.path.join(cache, key + ".json")
+        if os.path.exists(path):
+            with open(path) as f:
+                results[key] = json.load(f)["metrics"]
+        elif key not in results and config not in pending:
+            pending.append(config)
+    print(f"{len(configs) - len(pending)} thử nghiệm đã có trong bộ đệm, {len(pending)} thử nghiệm cần chạy")
+
+    if pending:
+        with mp.Pool(min(workers or mp.cpu_count(), len(pending))) as pool:
+            for config, metrics in pool.imap_unordered(run_trial, pending):
+                key = config_key(config)
+                results[key] = metrics
+                temporary = os.path.join(cache, key + ".json.tmp")
+                with open(temporary, "w") as f:
+                    json.dump({"config": config, "metrics": metrics}, f, indent=2)
+                os.replace(temporary, os.path.join(cache, key + ".json"))
+                print(f"xong {format_config(config)}: {metrics['catch_rate']:.4f} cừu/bước")
+    return [(config, results[config_key(config)]) for config in configs]
+
+
+def format_config(config):
+    return " ".join(f"{name}={config[name]:.4g}" if isinstance(config[name], float) else f"{name}={config[name]}"
+                    for name in PARAMETERS)
+
+
+def _values(text):
+    """"0.7" -> 0.7, "50" -> 50, "0.7:0.95" -> khoảng (0.7, 0.95) cho tìm kiếm ngẫu nhiên"""
+    def number(part):
+        return float(part) if any(c in part for c in ".eE") else int(part)
+    if ":" in text:
+        low, high = text.split(":")
+        return number(low), number(high)
+    return number(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m montecarlo sweep",
+                                     description="Quét siêu tham số song song, kết quả được lưu đệm theo băm cấu hình")
+    for name, default in PARAMETERS.items():
+        parser.add_argument("--" + name.replace("_", "-"), nargs="+", type=_values, default=[default],
+                            help=f"các giá trị cần thử (mặc định {default}); thấp:cao là khoảng cho --random "
+                                 "(khoảng âm viết dạng --death-reward=-500:-100)")
+    parser.add_argument("--random", type=int, default=None, help="số cấu hình ngẫu nhiên thay vì quét lưới")
+    parser.add_argument("--episodes", type=int, default=5000, help="số ván huấn luyện mỗi thử nghiệm")
+    parser.add_argument("--eval-episodes", type=int, default=500)
+    parser.add_argument("--max-steps", type=int, default=10000, help="cắt ván huấn luyện và đánh giá dài hơn số bước này")
+    parser.add_argument("--games", type=int, default=64, help="số ván chạy song song trong mỗi thử nghiệm")
+    parser.add_argument("--sync-episodes", type=int, default=256, help="số ván giữa hai lần cải thiện chính sách")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default="sweeps", help="thư mục lưu kết quả từng thử nghiệm")
+    args = parser.parse_args(argv)
+
+    options = vars(args)
+    space = {}
+    for name in PARAMETERS:
+        values = options[name]
+        ranges = [value for value in values if isinstance(value, tuple)]
+        if ranges and args.random is None:
+            parser.error(f"khoảng {name} chỉ dùng được với --random")
+        space[name] = ranges[0] if ranges else values
+    configs = random_configs(space, args.random, args.seed) if args.random else grid_configs(space)
+    budget = {name: options[name] for name in ("episodes", "eval_episodes", "max_steps", "games", "sync_episodes", "seed")}
+    configs = [{**config, **budget} for config in configs]
+
+    results = sweep(configs, args.cache, args.workers)
+    results.sort(key=lambda result: result[1]["catch_rate"], reverse=True)
+    print(f"{'cừu/bước':>9s} {'bước/cừu':>9s} {'cừu/ván':>8s}  cấu hình")
+    for config, metrics in results:
+        print(f"{metrics['catch_rate']:9.4f} {metrics['mean_steps_to_catch']:9.2f} {metrics['mean_catches']:8.2f}  "
+              f"{format_config(config)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+import numpy as np
+from . import checkpoint, instrument
+from .brain import Brain
+from .game.env import BatchEnv
+from .shared import SharedStatistics
+from .trajectory import TrajectoryRecorder
+
+
+def collect_episodes(brain, env, histories, episodes, backlog=None, max_steps=10000):
+    """Chạy env bằng chính sách của brain tới khi đủ `episodes` ván kết thúc, trả về (đúng `episodes` ván, số bước).
+    Các ván kết thúc cùng bước nhưng vượt quá số cần được giữ trong `backlog` cho lần gọi sau (không có thì bị bỏ).
+
+    Ván dài tới `max_steps` bước bị cắt bằng BatchEnv.truncate và vẫn được trả về để đánh giá: không có giới hạn này,
+    một vòng lặp tham lam không bắt được cừu cũng không va chạm sẽ giữ vị trí của ván đó mãi mãi. Với gamma < 1,
+    lợi nhuận của các bước chỉ thiếu phần sau điểm cắt (nhỏ hơn gamma^k ở bước cách điểm cắt k bước)"""
+    finished = backlog if backlog is not None else []
+    steps = 0
+    policy = brain.current_policy
+    while len(finished) < episodes:
+        codes = env.encoded()
+        actions = policy.get_actions(codes, env.directions)
+        _, rewards, dones = env.step(actions)
+        steps += env.n
+        for i, (code, action, reward) in enumerate(zip(codes.tolist(), actions.tolist(), rewards.tolist())):
+            histories[i].append([code, action, reward])
+        cut = ~dones & (env.steps >= max_steps)
+        if cut.any():
+            env.truncate(cut)
+        for i in np.flatnonzero(dones | cut):
+            finished.append(histories[i])
+            histories[i] = []
+    result = finished[:episodes]
+    del finished[:episodes]
+    return result, steps
+
+
+def _recorder(record, worker_id):
+    """Mỗi tiến trình ghi các ván của mình vào một thư mục con của `record`"""
+    return TrajectoryRecorder(os.path.join(record, f"worker-{worker_id:02d}")) if record else None
+
+
+def _worker(gamma, games, sync_episodes, seed, results, updates, record=None, worker_id=0, max_steps=10000):
+    """Tiến trình tự chơi: gom thống kê cục bộ, gửi về tiến trình điều phối rồi chờ chính sách mới.
+    Nhận None nghĩa là dừng"""
+    brain = Brain(gamma, seed=seed)
+    brain.recorder = _recorder(record, worker_id)
+    env = BatchEnv(games, seed=seed)
+    histories = [[] for _ in range(games)]
+    backlog = []
+    update = updates.get()
+    while update is not None:
+        actions, exploration, state_exploration = update
+        brain.current_policy.policy[:] = actions
+        brain.current_policy.exploration = exploration
+        brain.current_policy.set_state_exploration(state_exploration)
+        finished, steps = collect_episodes(brain, env, histories, sync_episodes, backlog, max_steps)
+        brain.evaluate_batch(finished, improve=False)
+        results.put((brain.rewards.copy(), brain.counts.copy(), brain.squares.copy(), len(finished), steps))
+        brain.reset_statistics()
+        update = updates.get()
+    if brain.recorder is not None:
+        brain.recorder.close()
+
+
+def _shared_worker(name, shards, index, gamma, games, sync_episodes, seed, results, stop, record=None,
+                   max_steps=10000):
+    """Tiến trình học ghi thẳng thống kê vào shard `index` của SharedStatistics và đọc chính sách tham lam từ đó,
+    không chờ tiến trình điều phối"""
+    table = SharedStatistics.attach(name, shards)
+    brain = Brain(gamma, seed=seed)
+    brain.rewards, brain.counts, brain.squares = table.shard(index)
+    brain.current_policy.policy = table.policy
+    brain.recorder = _recorder(record, index - 1)
+    env = BatchEnv(games, seed=seed)
+    histories = [[] for _ in range(games)]
+    backlog = []
+    while not stop.is_set():
+        table.refresh(brain.current_policy)
+        finished, steps = collect_episodes(brain, env, histories, sync_episodes, backlog, max_steps)
+        brain.evaluate_batch(finished, improve=False)
+        results.put((len(finished), steps))
+    if brain.recorder is not None:
+        brain.recorder.close()
+    # Các view vào vùng nhớ dùng chung phải được giải phóng trước khi đóng
+    del brain
+    table.close()
+
+
+def _drain(processes, results):
+    """Rút hết dữ liệu còn lại để các tiến trình con có thể thoát"""
+    while any(process.is_alive() for process in processes):
+        for result in results:
+            try:
+                result.get(timeout=0.05)
+            except queue.Empty:
+                pass
+    for process in processes:
+        process.join()
+
+
+def _publish(policy):
+    return policy.policy.copy(), policy.exploration, policy.state_exploration
+
+
+def _train_queues(brain, episodes, workers, games, sync_episodes, seed, record, patience, max_steps):
+    policy = brain.current_policy
+    results = [mp.Queue() for _ in range(workers)]
+    channels = [mp.Queue() for _ in range(workers)]
+    processes = []
+    for worker_id in range(workers):
+        worker_seed = None if seed is None else seed + worker_id
+        channels[worker_id].put(_publish(policy))
+        process = mp.Process(target=_worker, daemon=True,
+                             args=(brain.gamma, games, sync_episodes, worker_seed, results[worker_id], channels[worker_id],
+                                   record, worker_id, max_steps))
+        process.start()
+        processes.append(process)
+
+    total_episodes = 0
+    total_steps = 0
+    # Tiến trình đang chơi một lượt. Khi đã đủ số ván, mỗi tiến trình còn lại vẫn gửi nốt lượt đang chơi (đã được ghi
+    # nếu có record) và lượt đó được gộp trước khi tiến trình nhận None, nên bản ghi khớp đúng với brain đã lưu
+    running = list(range(workers))
+    index = 0
+    try:
+        while running:
+            worker_id = running[index]
+            rewards, counts, squares, finished, steps = results[worker_id].get()
+            touched = brain.merge(rewards, counts, squares)
+            policy.improve(brain.rewards, brain.counts, states=touched, episodes=finished, squares=brain.squares)
+            total_episodes += finished
+            total_steps += steps
+            if total_episodes >= episodes or (patience and policy.converged(patience)):
+                channels[worker_id].put(None)
+                running.pop(index)
+            else:
+                channels[worker_id].put(_publish(policy))
+                index += 1
+            if running:
+                index %= len(running)
+    finally:
+        for worker_id in running:
+            channels[worker_id].put(None)
+        _drain(processes, results)
+    return total_episodes, total_steps
+
+
+def _train_shared(brain, episodes, workers, games, sync_episodes, seed, record, patience, max_steps):
+    # Shard 0 giữ thống kê có sẵn của brain (khi huấn luyện tiếp), shard 1..workers thuộc các tiến trình học
+    table = SharedStatistics(workers + 1)
+    rewards, counts, squares = table.shard(0)
+    rewards[:] = brain.rewards
+    counts[:] = brain.counts
+    squares[:] = brain.squares
+    policy = brain.current_policy
+    table.policy[:] = policy.policy
+    policy.policy = table.policy
+    table.publish(policy)
+
+    results = mp.Queue()
+    stop = mp.Event()
+    processes = []
+    for worker_id in range(workers):
+        worker_seed = None if seed is None else seed + worker_id
+        process = mp.Process(target=_shared_worker, daemon=True,
+                             args=(table.name, table.shards, worker_id + 1, brain.gamma, games, sync_episodes,
+                                   worker_seed, results, stop, record, max_steps))
+        process.start()
+        processes.append(process)
+
+    total_episodes = 0
+    total_steps = 0
+    try:
+        while total_episodes < episodes and not (patience and policy.converged(patience)):
+            finished, steps = results.get()
+            brain.rewards, brain.counts, brain.squares = table.reduce()
+            policy.improve(brain.rewards, brain.counts, episodes=finished, squares=brain.squares)
+            table.publish(policy)
+            total_episodes += finished
+            total_steps += steps
+    finally:
+        stop.set()
+        _drain(processes, [results])
+        brain.rewards, brain.counts, brain.squares = table.reduce()
+        policy.policy = policy.policy.copy()
+        del rewards, counts, squares
+        table.close()
+    return total_episodes, total_steps
+
+
+def train(episodes, workers=None, gamma=0.78, games=64, sync_episodes=256, seed=None, brain=None, shared=False,
+          record=None, adaptive=False, patience=None, max_steps=10000):
+    """Huấn luyện bằng K tiến trình tự chơi, gộp thống kê và cải thiện chính sách ở tiến trình điều phối.
+
+    Mặc định kết quả được nhận lần lượt theo vòng tròn nên với cùng seed, lần chạy cho cùng kết quả. Với
+    shared=True các tiến trình ghi thẳng vào SharedStatistics và không chờ nhau: nhanh hơn nhưng không tái lập được.
+    `record` là thư mục lưu mọi ván đã chơi để học lại bằng trajectory.replay.
+    adaptive bật tỷ lệ khám phá theo từng trạng thái (mức trần là tỷ lệ khám phá hiện tại); với `patience`, việc
+    huấn luyện dừng sớm khi không hành động tham lam nào đổi trong ngần ấy ván liên tiếp. Ván dài hơn `max_steps`
+    bước bị cắt (xem collect_episodes)"""
+    workers = workers or mp.cpu_count()
+    brain = brain or Brain(gamma)
+    policy = brain.current_policy
+    if adaptive:
+        policy.adaptive = True
+        policy.initial_exploration = policy.exploration
+    start = time.perf_counter()
+    run = _train_shared if shared else _train_queues
+    total_episodes, total_steps = run(brain, episodes, workers, games, sync_episodes, seed, record, patience, max_steps)
+    elapsed = time.perf_counter() - start
+    if patience and policy.converged(patience):
+        print(f"Chính sách ổn định sau {total_episodes} ván (không đổi trong {policy.stable_episodes} ván)")
+    print(f"{total_episodes} ván, {total_steps} bước trong {elapsed:.1f}s "
+          f"({total_episodes / elapsed:.0f} ván/s, {total_steps / elapsed:.0f} bước/s)")
+    return brain
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m montecarlo train", description="Huấn luyện người chăn cừu không cần giao diện")
+    parser.add_argument("--episodes", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--games", type=int, default=64, help="số ván chạy song song trong mỗi tiến trình")
+    parser.add_argument("--sync-episodes", type=int, default=256, help="số ván giữa hai lần gửi thống kê")
+    parser.add_argument("--gamma", type=float, default=0.78)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--resume", default=None, help="checkpoint để huấn luyện tiếp")
+    parser.add_argument("--save", default=None, help="nơi ghi checkpoint sau khi huấn luyện")
+    parser.add_argument("--shared", action="store_true",
+                        help="các tiến trình ghi thống kê vào bộ nhớ dùng chung thay vì gửi qua hàng đợi (không tái lập được)")
+    parser.add_argument("--record", default=None, help="ghi mọi ván đã chơi vào thư mục này (mỗi tiến trình một thư mục con)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="tỷ lệ khám phá riêng cho từng trạng thái theo độ xáo trộn và phương sai của ước lượng")
+    parser.add_argument("--patience", type=int, default=None,
+                        help="dừng sớm khi không hành động tham lam nào đổi trong ngần ấy ván liên tiếp")
+    parser.add_argument("--max-steps", type=int, default=10000, help="cắt ván dài hơn số bước này")
+    parser.add_argument("--profile", default=None, help="ghi số liệu đo hiệu năng của tiến trình điều phối ra tệp JSON")
+    args = parser.parse_args(argv)
+    if args.profile:
+        instrument.enable()
+        instrument.dump_at_exit(args.profile)
+    brain = checkpoint.load(args.resume) if args.resume else None
+    brain = train(args.episodes, workers=args.workers, gamma=args.gamma, games=args.games,
+                  sync_episodes=args.sync_episodes, seed=args.seed, brain=brain, shared=args.shared,
+                  record=args.record, adaptive=args.adaptive, patience=args.patience, max_steps=args.max_steps)
+    if args.save:
+        checkpoint.save(args.save, brain)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import os
+import time
+import numpy as np
+from . import checkpoint
+from .brain import Brain
+
+# Mỗi bước là một dòng trong ba cột; ends.bin giữ vị trí kết thúc (không bao gồm) của từng ván
+STEP_COLUMNS = {
+    "state": np.dtype("u1"),   # trạng thái đã mã hóa (StateEncoder)
+    "action": np.dtype("u1"),  # Direction.value
+    "reward": np.dtype("<i2"),
+}
+ENDS = np.dtype("<i8")
+
+
+class TrajectoryRecorder:
+    """Ghi các ván đã kết thúc theo cột số nguyên nhỏ, đệm thành từng khối rồi nối vào cuối tệp.
+    Gán vào Brain.recorder để ghi mọi ván đi qua Brain.evaluate/evaluate_batch"""
+
+    def __init__(self, directory, chunk=1 << 16):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk = chunk
+        # Ghi tiếp vào bản ghi có sẵn. Nếu lần chạy trước dừng giữa lúc ghi cột bước và ends.bin, các dòng thừa
+        # ở cuối cột không thuộc ván nào và phải bị cắt bỏ để vị trí của các ván mới khớp với ends.bin
+        self.steps = TrajectoryReader(directory).steps
+        for name, dtype in STEP_COLUMNS.items():
+            path = os.path.join(directory, name + ".bin")
+            if os.path.exists(path) and os.path.getsize(path) > self.steps * dtype.itemsize:
+                os.truncate(path, self.steps * dtype.itemsize)
+        self.pending = {name: [] for name in STEP_COLUMNS}
+        self.pending_ends = []
+        self.pending_steps = 0
+
+    def append(self, codes, actions, rewards, lengths):
+        """Thêm các ván có cột đã nối và độ dài từng ván"""
+        rewards = np.asarray(rewards)
+        limits = np.iinfo(STEP_COLUMNS["reward"])
+        if len(rewards) and (rewards.min() < limits.min or rewards.max() > limits.max):
+            raise ValueError("Phần thưởng vượt quá khoảng lưu được của cột reward")
+        self.pending["state"].append(np.asarray(codes, dtype=STEP_COLUMNS["state"]))
+        self.pending["action"].append(np.asarray(actions, dtype=STEP_COLUMNS["action"]))
+        self.pending["reward"].append(rewards.astype(STEP_COLUMNS["reward"]))
+        self.pending_ends.append(self.steps + self.pending_steps + np.cumsum(lengths, dtype=np.int64))
+        self.pending_steps += len(rewards)
+        if self.pending_steps >= self.chunk:
+            self.flush()
+
+    def flush(self):
+        if not self.pending_ends:
+            return
+        # Các cột bước được ghi trước ends.bin nên người đọc chỉ thấy những ván đã có đủ dữ liệu
+        for name, blocks in self.pending.items():
+            with open(os.path.join(self.directory, name + ".bin"), "ab") as f:
+                f.write(np.concatenate(blocks).tobytes())
+            blocks.clear()
+        with open(os.path.join(self.directory, "ends.bin"), "ab") as f:
+            f.write(np.concatenate(self.pending_ends).astype(ENDS).tobytes())
+        self.pending_ends.clear()
+        self.steps += self.pending_steps
+        self.pending_steps = 0
+
+    def close(self):
+        self.flush()
+
+
+class TrajectoryReader:
+    """Ánh xạ (chỉ đọc) một bản ghi và trả về các ván theo lô để học lại"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        path = os.path.join(directory, "ends.bin")
+        size = os.path.getsize(path) // ENDS.itemsize if os.path.exists(path) else 0
+        self.ends = np.memmap(path, dtype=ENDS, mode="r", shape=(size,)) if size else np.zeros(0, ENDS)
+        self.steps = int(self.ends[-1]) if size else 0
+        self.columns = {name: np.memmap(os.path.join(directory, name + ".bin"), dtype=dtype, mode="r",
+                                        shape=(self.steps,)) if self.steps else np.zeros(0, dtype)
+                        for name, dtype in STEP_COLUMNS.items()}
+
+    def __len__(self):
+        return len(self.ends)
+
+    def episodes(self, start, stop):
+        """Các cột (state, action, reward) đã nối và độ dài của các ván [start, stop)"""
+        first = int(self.ends[start - 1]) if start else 0
+        ends = np.asarray(self.ends[start:stop])
+        last = int(ends[-1]) if len(ends) else first
+        lengths = np.diff(ends, prepend=first)
+        return (self.columns["state"][first:last], self.columns["action"][first:last],
+                self.columns["reward"][first:last], lengths)
+
+    def batches(self, episodes=4096):
+        for start in range(0, len(self), episodes):
+            yield self.episodes(start, min(start + episodes, len(self)))
+
+
+def recordings(paths):
+    """Mở các bản ghi; thư mục không có ends.bin được coi là chứa nhiều bản ghi con (ví dụ mỗi tiến trình một bản)"""
+    readers = []
+    for path in paths:
+        if os.path.exists(os.path.join(path, "ends.bin")):
+            readers.append(TrajectoryReader(path))
+        else:
+            readers.extend(TrajectoryReader(os.path.join(path, name)) for name in sorted(os.listdir(path))
+                           if os.path.exists(os.path.join(path, name, "ends.bin")))
+    return readers
+
+
+def replay(brain, readers, batch_episodes=4096, improve=True):
+    """Học lại từ các bản ghi: mỗi lô ván đi qua Brain.evaluate_arrays và Policy.improve một lần.
+    Trả về (số ván, số bước)"""
+    episodes = 0
+    steps = 0
+    for reader in readers:
+        for codes, actions, rewards, lengths in reader.batches(batch_episodes):
+            brain.evaluate_arrays(codes, actions, rewards, lengths, improve=improve)
+            episodes += len(lengths)
+            steps += len(codes)
+    return episodes, steps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m montecarlo replay",
+                                     description="Xây lại chính sách từ các ván đã ghi mà không cần mô phỏng")
+    parser.add_argument("recordings", nargs="+", help="thư mục bản ghi (train --record / play --record)")
+    parser.add_argument("--gamma", type=float, default=0.78)
+    parser.add_argument("--batch-episodes", type=int, default=4096, help="số ván mỗi lần cải thiện chính sách")
+    parser.add_argument("--resume", default=None, help="checkpoint để học tiếp")
+    parser.add_argument("--save", default=None, help="nơi ghi checkpoint sau khi học lại")
+    args = parser.parse_args(argv)
+    brain = checkpoint.load(args.resume) if args.resume else Brain(args.gamma)
+    start = time.perf_counter()
+    episodes, steps = replay(brain, recordings(args.recordings), args.batch_episodes)
+    elapsed = time.perf_counter() - start
+    print(f"{episodes} ván, {steps} bước trong {elapsed:.1f}s ({steps / max(elapsed, 1e-9):.0f} bước/s)")
+    if args.save:
+        checkpoint.save(args.save, brain)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from montecarlo import checkpoint
+from montecarlo.brain import Brain
+from montecarlo.policy import NO_ACTION
+from montecarlo.state import N_STATES, N_ACTIONS
+
+
+def trained_brain(seed=0):
+    rng = np.random.default_rng(seed)
+    brain = Brain(gamma=0.9)
+    brain.rewards[:] = rng.normal(size=(N_STATES, N_ACTIONS))
+    brain.counts[:] = rng.integers(0, 50, size=(N_STATES, N_ACTIONS))
+    brain.squares[:] = rng.random(size=(N_STATES, N_ACTIONS))
+    brain.current_policy.improve(brain.rewards, brain.counts)
+    brain.current_policy.exploration = 0.125
+    return brain
+
+
+def write_v1(path, brain):
+    """Tệp phiên bản 1 (chưa có squares) như các bản cũ đã ghi"""
+    record = np.zeros((), dtype=checkpoint.LAYOUT_V1)
+    record["header"]["magic"] = checkpoint.MAGIC
+    record["header"]["version"] = 1
+    record["header"]["n_states"] = N_STATES
+    record["header"]["n_actions"] = N_ACTIONS
+    record["exploration"] = brain.current_policy.exploration
+    record["improvements"] = brain.current_policy.improvements
+    record["gamma"] = brain.gamma
+    record["policy"] = brain.current_policy.policy
+    record["rewards"] = brain.rewards
+    record["counts"] = brain.counts
+    with open(path, "wb") as f:
+        f.write(record.tobytes())
+
+
+def assert_same_policy(policy, expected):
+    np.testing.assert_array_equal(policy.policy, expected.policy)
+    assert policy.exploration == expected.exploration
+    assert policy.improvements == expected.improvements
+
+
+def test_round_trip(tmp_path):
+    brain = trained_brain()
+    path = tmp_path / "brain.mcs"
+    checkpoint.save(path, brain)
+    loaded = checkpoint.load(path)
+    assert loaded.gamma == brain.gamma
+    np.testing.assert_array_equal(loaded.rewards, brain.rewards)
+    np.testing.assert_array_equal(loaded.counts, brain.counts)
+    np.testing.assert_array_equal(loaded.squares, brain.squares)
+    assert_same_policy(loaded.current_policy, brain.current_policy)
+    assert (loaded.current_policy.policy != NO_ACTION).any()
+    assert_same_policy(checkpoint.load_policy(path), brain.current_policy)
+
+
+def test_load_v1(tmp_path):
+    brain = trained_brain()
+    path = tmp_path / "brain-v1.mcs"
+    write_v1(path, brain)
+    loaded = checkpoint.load(path)
+    np.testing.assert_array_equal(loaded.rewards, brain.rewards)
+    np.testing.assert_array_equal(loaded.counts, brain.counts)
+    assert not loaded.squares.any()
+    assert_same_policy(loaded.current_policy, brain.current_policy)
+    assert_same_policy(checkpoint.load_policy(path), brain.current_policy)
+
+    # Lưu lại một checkpoint phiên bản 1 thì được ghi theo phiên bản hiện tại
+    checkpoint.save(tmp_path / "brain-v2.mcs", loaded)
+    header = np.fromfile(tmp_path / "brain-v2.mcs", dtype=checkpoint.HEADER, count=1)[0]
+    assert header["version"] == checkpoint.VERSION
+    np.testing.assert_array_equal(checkpoint.load(tmp_path / "brain-v2.mcs").rewards, brain.rewards)
+
+
+def test_load_does_not_modify_file(tmp_path):
+    brain = trained_brain()
+    path = tmp_path / "brain.mcs"
+    checkpoint.save(path, brain)
+    before = path.read_bytes()
+    loaded = checkpoint.load(path)
+    loaded.rewards[:] = 0
+    loaded.counts[:] = 0
+    del loaded
+    assert path.read_bytes() == before
+
+
+def test_rejects_unknown_version(tmp_path):
+    path = tmp_path / "brain.mcs"
+    checkpoint.save(path, trained_brain())
+    data = bytearray(path.read_bytes())
+    data[4:6] = (99).to_bytes(2, "little")
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        checkpoint.load(path)
@@ -0,0 +1,112 @@
+import random
+import numpy as np
+from montecarlo.game.direction import Direction
+from montecarlo.game.env import BatchEnv
+from montecarlo.game.grid import Grid
+from montecarlo.game.items import Sheep, Shepperd
+from montecarlo.game.tail import Tail
+from montecarlo.state import State, StateEncoder
+
+START = (0, 5)
+
+
+class ListGame:
+    """Vòng lặp gốc của reinforced_snake.py với past_positions là danh sách, làm chuẩn để so sánh"""
+
+    def __init__(self, grid, sheep_x, sheep_y):
+        self.grid = grid
+        self.shepperd = Shepperd(*START, grid)
+        self.sheep = Sheep(sheep_x, sheep_y)
+        self.past_positions = []
+        self.direction = Direction.RIGHT
+
+    def state(self):
+        return State(self.shepperd.get_sheep_direction(self.sheep),
+                     self.shepperd.get_queue_directions(self.past_positions[1:self.shepperd.sheeps], self.direction))
+
+    def step(self, direction):
+        """Một bước của vòng lặp gốc, trả về (bắt được cừu, va chạm)"""
+        self.direction = direction
+        self.shepperd.move(direction)
+        if len(self.past_positions) >= 200:
+            self.past_positions.pop()
+        caught = (self.shepperd.x_cell, self.shepperd.y_cell) == (self.sheep.x_cell, self.sheep.y_cell)
+        if caught:
+            self.shepperd.sheeps += 1
+        died = False
+        for i in range(self.shepperd.sheeps):
+            if (self.shepperd.x_cell, self.shepperd.y_cell) == self.past_positions[i]:
+                self.shepperd = Shepperd(*START, self.grid)
+                died = True
+                break
+        self.past_positions.insert(0, (self.shepperd.x_cell, self.shepperd.y_cell))
+        return caught, died
+
+    def choose(self, rng):
+        """Đi về phía cừu và tránh đuôi để đuôi đủ dài, thỉnh thoảng đi ngẫu nhiên để có va chạm"""
+        available = self.direction.get_available()
+        if rng.random() < 0.02:
+            return rng.choice(available)
+        tail = set(self.past_positions[:self.shepperd.sheeps])
+        side = self.grid.grid_side
+        moves = []
+        for direction in available:
+            probe = Shepperd(self.shepperd.x_cell, self.shepperd.y_cell, self.grid)
+            probe.move(direction)
+            if (probe.x_cell, probe.y_cell) not in tail:
+                distance = abs(probe.x_cell - self.sheep.x_cell) + abs(probe.y_cell - self.sheep.y_cell)
+                moves.append((distance if rng.random() < 0.9 else rng.randrange(2 * side), direction.value))
+        return Direction(min(moves)[1]) if moves else rng.choice(available)
+
+
+def test_batch_env_matches_list_loop():
+    games = 8
+    env = BatchEnv(games, grid_side=16, start=START, seed=0)
+    grid = Grid(16, 800)
+    references = [ListGame(grid, int(env.sheep_x[i]), int(env.sheep_y[i])) for i in range(games)]
+    for reference in references:
+        reference.past_positions.insert(0, START)
+    rng = random.Random(0)
+    longest = 0
+    for _ in range(4000):
+        codes = env.encoded()
+        assert codes.tolist() == [StateEncoder.encode(reference.state()) for reference in references]
+        actions = [reference.choose(rng) for reference in references]
+        _, rewards, dones = env.step(np.array([action.value for action in actions]))
+        for i, (reference, action) in enumerate(zip(references, actions)):
+            longest = max(longest, reference.shepperd.sheeps)
+            caught, died = reference.step(action)
+            assert env.caught[i] == caught
+            assert dones[i] == died
+            assert rewards[i] == (env.death_reward if died else env.catch_reward if caught else env.step_reward)
+            assert (env.x[i], env.y[i]) == (reference.shepperd.x_cell, reference.shepperd.y_cell)
+            # Vị trí cừu mới do env chọn ngẫu nhiên, bản chuẩn dùng lại vị trí đó
+            reference.sheep = Sheep(int(env.sheep_x[i]), int(env.sheep_y[i]))
+    assert longest >= 20, longest
+
+
+def test_tail_matches_list_loop():
+    grid = Grid(16, 800)
+    rng = random.Random(1)
+    reference = ListGame(grid, grid.random_cell(), grid.random_cell())
+    tail = Tail(grid.grid_side, capacity=200)
+    longest = 0
+    for _ in range(20000):
+        shepperd = reference.shepperd
+        assert (tail.facing_queue(shepperd.x_cell, shepperd.y_cell, reference.direction)
+                == reference.state().facing_queue)
+        assert tail.positions(0, shepperd.sheeps) == reference.past_positions[:shepperd.sheeps]
+        direction = reference.choose(rng)
+        moved = Shepperd(shepperd.x_cell, shepperd.y_cell, grid)
+        moved.move(direction)
+        caught, died = reference.step(direction)
+        longest = max(longest, shepperd.sheeps)
+        if caught:
+            tail.grow()
+            reference.sheep = Sheep(grid.random_cell(), grid.random_cell())
+        assert tail.occupied(moved.x_cell, moved.y_cell) == died
+        if died:
+            tail.reset()
+            reference.sheep = Sheep(grid.random_cell(), grid.random_cell())
+        tail.push(reference.shepperd.x_cell, reference.shepperd.y_cell)
+    assert longest >= 20, longest
@@ -0,0 +1,54 @@
+import numpy as np
+from montecarlo import checkpoint
+from montecarlo.brain import Brain
+from montecarlo.evaluate import evaluate, evaluate_parallel, summarize
+from montecarlo.policy import Policy
+from montecarlo.state import N_STATES, N_ACTIONS
+
+
+def trained_brain(seed=0):
+    rng = np.random.default_rng(seed)
+    brain = Brain(0.78, seed=seed)
+    brain.rewards[:] = rng.normal(size=(N_STATES, N_ACTIONS))
+    brain.counts[:] = 1
+    brain.current_policy.improve(brain.rewards, brain.counts)
+    return brain
+
+
+def run(policy, seed=0):
+    policy.rng = np.random.default_rng(seed)
+    return evaluate(policy, episodes=60, games=16, max_steps=2000, seed=seed)
+
+
+def test_evaluate_is_greedy_and_leaves_the_policy_alone():
+    greedy = Policy()
+    greedy.policy[:] = trained_brain().current_policy.policy
+    adaptive = Policy(exploration=0.3, adaptive=True)
+    adaptive.policy[:] = greedy.policy
+    adaptive.set_state_exploration(np.full(N_STATES, 0.3))
+
+    expected = run(greedy)
+    results = run(adaptive)
+    for name in expected:
+        np.testing.assert_array_equal(results[name], expected[name])
+    assert adaptive.exploration == 0.3
+    np.testing.assert_array_equal(adaptive.state_exploration, 0.3)
+
+
+def test_evaluate_samples_exactly_the_started_episodes():
+    results = run(trained_brain().current_policy)
+    assert len(results["episode_length"]) == 60
+    # Mọi lần bắt thuộc về một ván trong mẫu, độ dài đuôi tính cả lần bắt ngay trước khi va chạm
+    np.testing.assert_array_equal(np.bincount(results["catch_episode"], minlength=60), results["catches"])
+    np.testing.assert_array_equal(results["tail_length"], np.minimum(results["catches"], 200))
+    summary = summarize(results)
+    assert summary["distributions"]["steps_to_catch"]["count"] == results["catches"].sum()
+
+
+def test_evaluate_parallel_does_not_depend_on_workers(tmp_path):
+    path = tmp_path / "brain.mcs"
+    checkpoint.save(path, trained_brain())
+    one = evaluate_parallel(str(path), episodes=120, workers=1, games=16, max_steps=2000, seed=3, chunk=50)
+    two = evaluate_parallel(str(path), episodes=120, workers=2, games=16, max_steps=2000, seed=3, chunk=50)
+    for name in one:
+        np.testing.assert_array_equal(one[name], two[name])
@@ -0,0 +1,45 @@
+import random
+import pytest
+from montecarlo.game.direction import ComplexDirection
+from montecarlo.game.flock import Flock
+from montecarlo.game.grid import Grid
+from montecarlo.game.items import Shepperd
+
+
+def place(flock, positions):
+    """Đặt lại vị trí cả đàn và dựng lại chỉ mục"""
+    for sheep in flock:
+        flock._remove(sheep)
+    for sheep, (x, y) in zip(flock, positions):
+        sheep.x_cell, sheep.y_cell = x, y
+        flock._insert(sheep)
+
+
+@pytest.mark.parametrize("side", [16, 17, 40])
+@pytest.mark.parametrize("count", [1, 3, 10, 50])
+def test_nearest_matches_brute_force(side, count):
+    random.seed(side * 100 + count)
+    flock = Flock(Grid(side, 800), count)
+    for _ in range(300):
+        x, y = random.randrange(side), random.randrange(side)
+        nearest = flock.nearest(x, y)
+        best = min(abs(x - sheep.x_cell) + abs(y - sheep.y_cell) for sheep in flock)
+        assert abs(x - nearest.x_cell) + abs(y - nearest.y_cell) == best
+        flock.respawn(random.choice(flock.sheep))
+
+
+def test_nearest_agrees_with_sheep_direction_across_the_edge():
+    grid = Grid(16, 800)
+    flock = Flock(grid, 2)
+    # Một con ngay bên kia mép trái (gần hơn nếu quấn biên), một con ở bên phải
+    place(flock, [(15, 5), (4, 5)])
+    nearest = flock.nearest(0, 5)
+    assert (nearest.x_cell, nearest.y_cell) == (4, 5)
+    assert Shepperd(0, 5, grid).get_sheep_direction(nearest) == ComplexDirection.RIGHT
+
+
+def test_empty_flock():
+    flock = Flock(Grid(16, 800), 0)
+    assert len(flock) == 0
+    assert flock.nearest(3, 4) is None
+    assert flock.at(3, 4) is None
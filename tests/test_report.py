@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from montecarlo.explain import ShapleyExplainer
+from montecarlo.policy import NO_ACTION, Policy
+from montecarlo.report import count_pairs, summarize
+from montecarlo.state import N_STATES, N_ACTIONS
+from montecarlo.trajectory import TrajectoryReader, TrajectoryRecorder
+
+
+def greedy_policy(seed=0):
+    rng = np.random.default_rng(seed)
+    policy = Policy(seed)
+    policy.policy[:] = rng.integers(0, N_ACTIONS, N_STATES)
+    policy.policy[rng.choice(N_STATES, 20, replace=False)] = NO_ACTION
+    return policy
+
+
+def logged_counts(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 30, size=(N_STATES, N_ACTIONS)) * (rng.random((N_STATES, 1)) < 0.8)
+
+
+def test_headline_explains_the_greedy_action():
+    policy = greedy_policy()
+    counts = logged_counts()
+    summary, _ = summarize(policy, counts)
+
+    explainer = ShapleyExplainer(policy)
+    total = counts.sum()
+    attributed = 0
+    magnitude = np.zeros(2)
+    agrees = 0
+    for code in range(N_STATES):
+        visits = counts[code].sum()
+        greedy = int(policy.policy[code])
+        if not visits or greedy == NO_ACTION:
+            continue
+        attributed += visits
+        magnitude += visits * np.abs(explainer.shap_values_encoded(code, greedy))
+        agrees += counts[code, greedy]
+
+    assert summary["steps"] == total
+    assert summary["attributed_steps"] == attributed
+    assert summary["attributed_steps"] + summary["unattributed_steps"] == total
+    assert summary["mean_abs_sheep"] == pytest.approx(magnitude[0] / attributed)
+    assert summary["mean_abs_queue"] == pytest.approx(magnitude[1] / attributed)
+    assert sum(action["steps"] for action in summary["per_action"].values()) == attributed
+    assert summary["logged"]["steps"] == total
+    assert summary["logged"]["greedy_agreement"] == pytest.approx(agrees / total)
+
+
+def test_exploratory_actions_do_not_change_the_headline():
+    policy = greedy_policy()
+    counts = logged_counts()
+    # Cùng số lần mỗi trạng thái xuất hiện, nhưng mọi bước đều đi theo một hành động khác
+    shifted = np.zeros_like(counts)
+    shifted[:, 0] = counts.sum(axis=1)
+    summary, _ = summarize(policy, counts)
+    other, _ = summarize(policy, shifted)
+    for key in ("steps", "attributed_steps", "mean_abs_sheep", "mean_abs_queue", "sheep_share", "per_action"):
+        assert other[key] == summary[key]
+    assert other["logged"] != summary["logged"]
+
+
+def test_count_pairs(tmp_path):
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, N_STATES, 5000)
+    actions = rng.integers(0, N_ACTIONS, 5000)
+    recorder = TrajectoryRecorder(tmp_path)
+    recorder.append(codes, actions, np.full(5000, -1), [1000] * 5)
+    recorder.close()
+    expected = np.zeros((N_STATES, N_ACTIONS), dtype=np.int64)
+    np.add.at(expected, (codes, actions), 1)
+    np.testing.assert_array_equal(count_pairs([TrajectoryReader(tmp_path)], batch_steps=777), expected)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from montecarlo.stats_log import Downsampler
+
+
+@pytest.mark.parametrize("buckets", [0, 1, 7, 999])
+def test_downsampler_rejects_odd_bucket_count(buckets):
+    with pytest.raises(ValueError):
+        Downsampler(buckets)
+
+
+@pytest.mark.parametrize("buckets", [2, 8, 1000])
+def test_downsampler_matches_direct_buckets(buckets):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=5003)
+    sampler = Downsampler(buckets)
+    # Thêm theo từng đoạn có độ dài khác nhau như khi đọc log dần
+    start = 0
+    while start < len(values):
+        stop = start + int(rng.integers(1, 400))
+        sampler.extend(values[start:stop])
+        start = stop
+    x, low, high, mean = sampler.series()
+    assert len(x) <= buckets
+    groups = [values[i:i + sampler.width] for i in range(0, len(values), sampler.width)]
+    np.testing.assert_array_equal(low, [group.min() for group in groups])
+    np.testing.assert_array_equal(high, [group.max() for group in groups])
+    np.testing.assert_allclose(mean, [group.mean() for group in groups])
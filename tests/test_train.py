@@ -0,0 +1,41 @@
+from montecarlo.brain import Brain
+from montecarlo.game.direction import Direction
+from montecarlo.game.env import BatchEnv
+from montecarlo.sweep import PARAMETERS, run_trial
+from montecarlo.train import collect_episodes
+
+
+def test_collect_episodes_returns_exactly_the_requested_count():
+    brain = Brain(0.78, seed=0)
+    env = BatchEnv(32, seed=0)
+    histories = [[] for _ in range(32)]
+    backlog = []
+    for requested in (5, 64, 1, 30):
+        finished, _ = collect_episodes(brain, env, histories, requested, backlog)
+        assert len(finished) == requested
+    assert all(history[-1][2] == env.death_reward for history in backlog)
+
+
+def test_sweep_trial_trains_exactly_its_budget():
+    config = {**PARAMETERS, "episodes": 100, "eval_episodes": 20, "max_steps": 2000, "games": 16,
+              "sync_episodes": 64, "seed": 0}
+    _, metrics = run_trial(config)
+    assert metrics["train_episodes"] == 100
+
+
+def test_collect_episodes_cuts_runaway_games():
+    brain = Brain(0.78, seed=0)
+    policy = brain.current_policy
+    # Luôn đi sang phải: vòng lặp trên một hàng, hầu như không bắt được cừu và không va chạm
+    policy.policy[:] = Direction.RIGHT.value
+    policy.exploration = 0.0
+    env = BatchEnv(8, seed=0)
+    histories = [[] for _ in range(8)]
+    backlog = []
+    finished, _ = collect_episodes(brain, env, histories, 16, backlog, max_steps=50)
+    assert len(finished) == 16
+    assert max(len(history) for history in finished) == 50
+    assert max(len(history) for history in histories) < 50
+    # Ván bị cắt vẫn đánh giá được
+    brain.evaluate_batch(finished)
+    assert brain.counts.sum() == sum(len(history) for history in finished)
@@ -0,0 +1,58 @@
+import os
+import numpy as np
+from montecarlo.brain import Brain
+from montecarlo.game.env import BatchEnv
+from montecarlo.train import collect_episodes, train
+from montecarlo.trajectory import STEP_COLUMNS, TrajectoryReader, TrajectoryRecorder, recordings, replay
+
+
+def assert_same_statistics(brain, expected):
+    np.testing.assert_array_equal(brain.counts, expected.counts)
+    np.testing.assert_allclose(brain.rewards, expected.rewards, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(brain.squares, expected.squares, rtol=1e-9, atol=1e-6)
+
+
+def test_record_then_replay(tmp_path):
+    brain = Brain(0.78, seed=0)
+    brain.recorder = TrajectoryRecorder(tmp_path, chunk=1000)
+    env = BatchEnv(16, seed=0)
+    histories = [[] for _ in range(16)]
+    for _ in range(5):
+        finished, _ = collect_episodes(brain, env, histories, 64)
+        brain.evaluate_batch(finished)
+    brain.recorder.close()
+
+    replayed = Brain(0.78)
+    episodes, steps = replay(replayed, [TrajectoryReader(tmp_path)], batch_episodes=64)
+    assert episodes == 5 * 64
+    assert steps == brain.counts.sum()
+    assert_same_statistics(replayed, brain)
+    np.testing.assert_array_equal(replayed.current_policy.policy, brain.current_policy.policy)
+
+
+def test_resume_drops_orphaned_rows(tmp_path):
+    recorder = TrajectoryRecorder(tmp_path)
+    recorder.append([1, 2, 3], [0, 1, 2], [-1, 50, -300], [3])
+    recorder.close()
+    # Lần chạy trước dừng sau khi ghi cột bước nhưng trước khi ghi ends.bin
+    for name, dtype in STEP_COLUMNS.items():
+        with open(os.path.join(tmp_path, name + ".bin"), "ab") as f:
+            f.write(np.full(5, 9, dtype=dtype).tobytes())
+
+    recorder = TrajectoryRecorder(tmp_path)
+    recorder.append([7, 8], [3, 3], [50, -300], [2])
+    recorder.close()
+    reader = TrajectoryReader(tmp_path)
+    assert len(reader) == 2 and reader.steps == 5
+    codes, actions, rewards, lengths = reader.episodes(1, 2)
+    assert codes.tolist() == [7, 8] and actions.tolist() == [3, 3] and rewards.tolist() == [50, -300]
+    for name, dtype in STEP_COLUMNS.items():
+        assert os.path.getsize(os.path.join(tmp_path, name + ".bin")) == 5 * dtype.itemsize
+
+
+def test_train_recording_matches_saved_brain(tmp_path):
+    brain = train(300, workers=2, games=16, sync_episodes=32, seed=0, record=str(tmp_path))
+    replayed = Brain(brain.gamma)
+    episodes, _ = replay(replayed, recordings([str(tmp_path)]))
+    assert episodes >= 300
+    assert_same_statistics(replayed, brain)